@@ -0,0 +1,69 @@
+"""
+Cold start of a short-lived process doing a single lookup (CLI job, serverless function), per HTTP backend.
+
+Every run is a fresh interpreter which measures import of the converter module, the first call (loop, session
+and connection setup plus request) and the second uncached call on the warm connection, against local stand-in
+Exchange API (see benchmarks/server.py). Medians over runs are reported in milliseconds:
+
+    python -m benchmarks.bench_cold_start --runs 20
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.server import StandInApi, StandInServer
+from currency_exchange.transport import HTTP_BACKENDS
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+from currency_exchange.converter import CurrencyConverter
+imported = time.perf_counter()
+with CurrencyConverter(exchange_api=sys.argv[1], fallback_apis=[], http_backend=sys.argv[2]) as currency_client:
+    currency_client.get_exchange_rate('usd', 'uah')
+    first_call = time.perf_counter()
+    currency_client.get_exchange_rate('usd', 'uah', date='2024-11-20')
+    second_call = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1e3,
+    'first_call_ms': (first_call - imported) * 1e3,
+    'second_call_ms': (second_call - first_call) * 1e3,
+    'aiohttp_imported': 'aiohttp' in sys.modules,
+}))
+'''
+
+
+def bench_backend(server: StandInServer, http_backend: str, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', CHILD, server.exchange_api, http_backend], capture_output=True, text=True, check=True
+        ).stdout
+        sample = json.loads(output)
+        sample['process_ms'] = (time.perf_counter() - started) * 1e3
+        samples.append(sample)
+    result = {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ('import_ms', 'first_call_ms', 'second_call_ms', 'process_ms')
+    }
+    result['aiohttp_imported'] = samples[-1]['aiohttp_imported']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help="fresh interpreters per backend")
+    parser.add_argument('--latency', type=float, default=0.0, help="stand-in API response delay in seconds")
+    args = parser.parse_args()
+    with StandInServer(StandInApi(latency=args.latency)) as server:
+        results = {http_backend: bench_backend(server, http_backend, args.runs) for http_backend in HTTP_BACKENDS}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-call overhead of the library when rate tables are already in memory.
+
+Rate tables are put into the in-memory cache up front, so the numbers show only argument normalization,
+cache lookup, logging and rate selection of get_exchange_rate / convert, compared with a plain dict lookup,
+and vectorized convert_array over a column of amounts (with numpy installed).
+
+    python -m benchmarks.bench_hot_path --repeat 100000
+"""
+
+import argparse
+import json
+import logging
+
+from benchmarks.common import make_rate_table, measure
+from currency_exchange.arrays import import_numpy
+from currency_exchange.converter import CurrencyConverter
+
+
+def warm_client(**kwargs) -> CurrencyConverter:
+    currency_client = CurrencyConverter(**kwargs)
+    for base in ('usd', 'eur'):
+        endpoint = f"{currency_client.currencies_endpoint}{base}.json"
+        currency_client.cache.set(currency_client._cache_key(endpoint), make_rate_table(base, '2024-11-29'))
+    return currency_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=100_000)
+    args = parser.parse_args()
+
+    currency_client = warm_client()
+    table = make_rate_table('usd', '2024-11-29')
+    results = {
+        'dict_lookup': measure(lambda: table['usd']['uah'], repeat=args.repeat),
+        'get_exchange_rate': measure(lambda: currency_client.get_exchange_rate('usd', 'uah'), repeat=args.repeat),
+        'convert': measure(lambda: currency_client.convert(100, 'USD', 'UAH'), repeat=args.repeat),
+        'build_base_url': measure(lambda: currency_client._build_base_url('2024-11-20'), repeat=args.repeat),
+    }
+
+    np = import_numpy()
+    if np is not None:
+        # one call for a column of 100k amounts in 3 currencies, compare with convert mean_us * 100k
+        amounts = np.linspace(1, 1000, 100_000)
+        currencies_to_get = np.array(['uah', 'eur', 'gbp'])[np.arange(len(amounts)) % 3]
+        out = np.empty(len(amounts))
+        results['convert_array_100k'] = measure(
+            lambda: currency_client.convert_array(amounts, 'usd', currencies_to_get, out=out),
+            repeat=max(args.repeat // 10_000, 3),
+        )
+
+    pivot_client = warm_client(pivot_currency='usd')
+    results['pivot_get_exchange_rate'] = measure(
+        lambda: pivot_client.get_exchange_rate('eur', 'uah'), repeat=args.repeat
+    )
+
+    # cost of formatting debug messages when DEBUG level is actually enabled, records are discarded
+    logger = currency_client.logger
+    handlers, logger.handlers = logger.handlers, [logging.NullHandler()]
+    logger.setLevel(logging.DEBUG)
+    try:
+        results['get_exchange_rate_debug'] = measure(
+            lambda: currency_client.get_exchange_rate('usd', 'uah'), repeat=max(args.repeat // 10, 1)
+        )
+    finally:
+        logger.setLevel(logging.NOTSET)
+        logger.handlers = handlers
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare memory-mapped snapshot lookups with per-call fetch path.
+
+Network is simulated by ExchangeApiClient._fetch override which sleeps for --latency seconds and returns
+realistic ~300 rates table, so the numbers show library overhead plus configured round trip.
+
+    python -m benchmarks.bench_snapshot --days 30 --latency 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.common import dates, make_rate_table, measure
+from currency_exchange.converter import CurrencyConverter
+from currency_exchange.snapshot import RateSnapshot
+
+
+class SimulatedConverter(CurrencyConverter):
+    latency: float = 0.0
+
+    async def _fetch(self, urls: list, endpoint: str, params=None) -> dict:
+        await asyncio.sleep(self.latency)
+        base = endpoint.rsplit('/', 1)[-1].removesuffix('.json')
+        return make_rate_table(base, urls[0].split('@')[1].split('/')[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--bases', default='usd,eur,gbp')
+    parser.add_argument('--latency', type=float, default=0.02, help="simulated round trip in seconds")
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    bases = args.bases.split(',')
+    snapshot_dates = dates(args.days)
+
+    SimulatedConverter.latency = args.latency
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, SimulatedConverter(cache_maxsize=0) as currency_client:
+        path = os.path.join(tmp_dir, 'rates.snapshot')
+        started = time.perf_counter()
+        tables = currency_client.build_snapshot(path, snapshot_dates, bases, max_concurrency=16)
+        results['build'] = {'tables': tables, 'seconds': time.perf_counter() - started, 'bytes': os.path.getsize(path)}
+
+        currency_client.currency_date = snapshot_dates[-1]
+        results['fetch_per_call'] = measure(
+            lambda: currency_client.get_exchange_rate('usd', 'uah'), repeat=max(args.repeat // 10, 1)
+        )
+
+        started = time.perf_counter()
+        snapshot = RateSnapshot(path)
+        results['open_seconds'] = time.perf_counter() - started
+        offline_client = CurrencyConverter(snapshot=snapshot, currency_date=snapshot_dates[-1])
+        results['snapshot_converter_call'] = measure(
+            lambda: offline_client.get_exchange_rate('usd', 'uah'), repeat=args.repeat * 10
+        )
+        results['snapshot_raw_lookup'] = measure(lambda: snapshot.rate('usd', 'uah'), repeat=args.repeat * 10)
+        snapshot.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
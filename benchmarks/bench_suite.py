@@ -0,0 +1,225 @@
+"""
+Request path benchmarks against local stand-in Exchange API (see benchmarks/server.py).
+
+Measures single-call latency (cold fetch, cached and revalidated with ETag), sustained throughput of sync
+and async converters, batch conversion and historical fan-out, and memory per converter instance.
+Results are written as JSON to compare releases:
+
+    python -m benchmarks.bench_suite --latency 0.005 --output bench.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from importlib import metadata
+
+from benchmarks.common import currency_codes, dates, measure
+from benchmarks.server import StandInApi, StandInServer
+from currency_exchange.converter import AsyncCurrencyConverter, CurrencyConverter
+from currency_exchange.metrics import Metrics
+
+
+def bench_single_call(server: StandInServer, repeat: int) -> dict:
+    with CurrencyConverter(
+        exchange_api=server.exchange_api, fallback_apis=server.fallback_apis, cache_maxsize=0
+    ) as currency_client:
+        currency_client.get_exchange_rate('usd', 'uah')  # open connection
+        cold = measure(lambda: currency_client.get_exchange_rate('usd', 'uah'), repeat=repeat)
+    with CurrencyConverter(exchange_api=server.exchange_api, fallback_apis=server.fallback_apis) as currency_client:
+        currency_client.get_exchange_rate('usd', 'uah')
+        cached = measure(lambda: currency_client.get_exchange_rate('usd', 'uah'), repeat=repeat * 10)
+    return {'fetch': cold, 'cached': cached}
+
+
+def bench_revalidation(server: StandInServer, repeat: int) -> dict:
+    """
+    Every call revalidates expired 'latest' table (latest_ttl=0), with and without conditional requests
+    """
+    results = {}
+    for name, validators_maxsize in (('conditional', 256), ('unconditional', 0)):
+        metrics = Metrics()
+        with CurrencyConverter(
+            exchange_api=server.exchange_api,
+            fallback_apis=server.fallback_apis,
+            latest_ttl=0,
+            validators_maxsize=validators_maxsize,
+            metrics=metrics,
+        ) as currency_client:
+            latency = measure(lambda: currency_client.get_exchange_rate('usd', 'uah'), repeat=repeat)
+        snapshot = metrics.snapshot()
+        results[name] = {
+            **latency,
+            'responses': snapshot['requests'].get('/currencies/usd.json', {}),
+            'bytes_downloaded': snapshot['bytes_downloaded'],
+        }
+    return results
+
+
+def bench_sync_throughput(server: StandInServer, duration: float, threads: int) -> dict:
+    """Threads share one converter without cache, so every call is a request"""
+    codes = currency_codes()[:threads]
+    deadline = time.perf_counter() + duration
+    calls, errors = [0] * threads, [0] * threads
+    with CurrencyConverter(
+        exchange_api=server.exchange_api, fallback_apis=server.fallback_apis, cache_maxsize=0
+    ) as currency_client:
+
+        def worker(i):
+            while time.perf_counter() < deadline:
+                try:
+                    currency_client.get_exchange_rate(codes[i], 'usd')
+                    calls[i] += 1
+                except Exception:
+                    errors[i] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, range(threads)))
+        elapsed = time.perf_counter() - started
+    return {'threads': threads, 'calls': sum(calls), 'errors': sum(errors), 'calls_per_second': sum(calls) / elapsed}
+
+
+def bench_async_throughput(server: StandInServer, duration: float, concurrency: int) -> dict:
+    return asyncio.run(_async_throughput(server, duration, concurrency))
+
+
+async def _async_throughput(server: StandInServer, duration: float, concurrency: int) -> dict:
+    codes = currency_codes()[:concurrency]
+    deadline = time.perf_counter() + duration
+    calls, errors = 0, 0
+    async with AsyncCurrencyConverter(
+        exchange_api=server.exchange_api, fallback_apis=server.fallback_apis, cache_maxsize=0
+    ) as currency_client:
+
+        async def worker(code):
+            nonlocal calls, errors
+            while time.perf_counter() < deadline:
+                try:
+                    await currency_client.get_exchange_rate(code, 'usd')
+                    calls += 1
+                except Exception:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(code) for code in codes))
+        elapsed = time.perf_counter() - started
+    return {'concurrency': concurrency, 'calls': calls, 'errors': errors, 'calls_per_second': calls / elapsed}
+
+
+def bench_batch(server: StandInServer, rows: int, days: int) -> dict:
+    """convert_many over rows spread across 10 base currencies and days dates"""
+    codes, batch_dates = currency_codes()[:10], dates(days)
+    requests = [(i % 1000 + 1, codes[i % len(codes)], 'uah', batch_dates[i % days]) for i in range(rows)]
+    with CurrencyConverter(exchange_api=server.exchange_api, fallback_apis=server.fallback_apis) as currency_client:
+        started = time.perf_counter()
+        results = currency_client.convert_many(requests, errors='nan', max_concurrency=16)
+        elapsed = time.perf_counter() - started
+    failed = sum(result != result for result in results)
+    return {
+        'rows': rows,
+        'tables': len(codes) * days,
+        'failed': failed,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed,
+    }
+
+
+def bench_series(server: StandInServer, days: int) -> dict:
+    with CurrencyConverter(exchange_api=server.exchange_api, fallback_apis=server.fallback_apis) as currency_client:
+        start, end = dates(days)[0], dates(days)[-1]
+        started = time.perf_counter()
+        series = currency_client.get_rate_series('usd', ['eur', 'uah', 'gbp'], start, end, max_concurrency=16)
+        elapsed = time.perf_counter() - started
+    return {'days': len(series.dates), 'seconds': elapsed}
+
+
+def bench_memory(server: StandInServer, instances: int, tables: int) -> dict:
+    """
+    :return: dict: tracemalloc bytes per idle converter instance and per rate table cached by warm instance
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    converters = [CurrencyConverter(exchange_api=server.exchange_api) for _ in range(instances)]
+    gc.collect()
+    idle = tracemalloc.take_snapshot().compare_to(before, 'filename')
+    idle_bytes = sum(stat.size_diff for stat in idle)
+
+    currency_client = converters[0]
+    currency_client.get_exchange_rate('usd', 'eur')  # start background loop and connection pool
+    before = tracemalloc.take_snapshot()
+    currency_client.warm(dates(tables), ['usd'])
+    gc.collect()
+    warm = tracemalloc.take_snapshot().compare_to(before, 'filename')
+    warm_bytes = sum(stat.size_diff for stat in warm)
+    tracemalloc.stop()
+    for converter in converters:
+        converter.close()
+    return {
+        'instances': instances,
+        'bytes_per_instance': idle_bytes / instances,
+        'tables': tables,
+        'bytes_per_cached_table': warm_bytes / tables,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.005, help="stand-in API response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="random extra delay in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of failed responses")
+    parser.add_argument('--repeat', type=int, default=200, help="calls per latency measurement")
+    parser.add_argument('--duration', type=float, default=3.0, help="seconds per throughput measurement")
+    parser.add_argument('--concurrency', type=int, default=32, help="threads or coroutines for throughput")
+    parser.add_argument('--rows', type=int, default=100_000, help="rows of batch conversion")
+    parser.add_argument('--days', type=int, default=90, help="dates of batch conversion and time series")
+    parser.add_argument('--output', help="JSON file for results, stdout by default")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # failed requests are reported in results instead of being logged
+
+    api = StandInApi(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    with StandInServer(api) as server:
+        results = {
+            'single_call': bench_single_call(server, args.repeat),
+            'revalidation': bench_revalidation(server, args.repeat),
+            'sync_throughput': bench_sync_throughput(server, args.duration, args.concurrency),
+            'async_throughput': bench_async_throughput(server, args.duration, args.concurrency),
+            'batch': bench_batch(server, args.rows, args.days),
+            'series': bench_series(server, args.days),
+            'memory': bench_memory(server, instances=100, tables=args.days),
+        }
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'pyxrate': _package_version(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'args': vars(args),
+            'server_responses': {str(status): count for status, count in sorted(api.requests.items())},
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    print(output)
+
+
+def _package_version():
+    try:
+        return metadata.version('pyxrate')
+    except metadata.PackageNotFoundError:
+        return None
+
+
+if __name__ == '__main__':
+    main()
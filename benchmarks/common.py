@@ -0,0 +1,47 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+CURRENCIES_COUNT = 300
+
+
+def currency_codes(count: int = CURRENCIES_COUNT) -> list:
+    """Realistic number of currency codes: fiat codes first, then synthetic ones"""
+    codes = ['usd', 'eur', 'gbp', 'uah', 'jpy', 'chf', 'pln', 'cad', 'aud', 'cny']
+    codes += [f"c{i:03d}" for i in range(count - len(codes))]
+    return codes
+
+
+def make_rate_table(base: str, date: str, codes: list = None, seed: int = 0) -> dict:
+    """Rate table in Exchange API format, e.g. /currencies/usd.json"""
+    codes = codes or currency_codes()
+    rnd = random.Random(f"{seed}-{base}-{date}")
+    return {'date': date, base: {code: 1.0 if code == base else round(rnd.uniform(0.001, 1000.0), 8) for code in codes}}
+
+
+def make_currencies_table(codes: list = None) -> dict:
+    """Currency names in Exchange API format, e.g. /currencies.json"""
+    return {code: f"Currency {code.upper()}" for code in (codes or currency_codes())}
+
+
+def dates(count: int, start: date = date(2024, 3, 2)) -> list:
+    return [(start + timedelta(days=i)).isoformat() for i in range(count)]
+
+
+def measure(func, repeat: int = 1000) -> dict:
+    """
+    :return: dict: per-call latency statistics in microseconds
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return {
+        'calls': repeat,
+        'mean_us': statistics.fmean(samples),
+        'p50_us': samples[len(samples) // 2],
+        'p99_us': samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
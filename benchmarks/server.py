@@ -0,0 +1,179 @@
+"""
+Local stand-in for Exchange API with configurable latency and error injection.
+
+Serves /currencies.json and /currencies/{base}.json with realistic payloads for every mirror path
+/{mirror}@{date}/v1 and /{mirror}/{date}/v1, e.g. http://127.0.0.1:8080/api@2024-11-20/v1/currencies/usd.json.
+Like CDN, bodies are pre-compressed with gzip and have ETag, matching If-None-Match is answered with 304.
+
+    python -m benchmarks.server --port 8080 --latency 0.02 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+from collections import Counter
+
+from aiohttp import web
+
+from benchmarks.common import currency_codes, make_currencies_table, make_rate_table
+
+LATEST_DATE = '2024-11-29'
+PATH_RE = re.compile(r'^/(\w+)[@/]([^/]+)/v1(/.*)$')
+
+
+class StandInApi:
+    """
+    :param latency: response delay in seconds
+    :param jitter: random extra delay in 0..jitter seconds
+    :param error_rate: fraction of requests answered with error_status
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        codes: list = None,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.codes = codes or currency_codes()
+        self.requests = Counter()
+        self._random = random.Random(seed)
+        self._bodies = {}
+
+    def _body(self, date: str, endpoint: str):
+        """
+        Payloads are generated once per (date, endpoint) and served as bytes, like from CDN
+        :return: tuple: (body, gzip compressed body, ETag) or None for unknown base currency
+        """
+        body = self._bodies.get((date, endpoint))
+        if body is None:
+            if endpoint == '/currencies.json':
+                data = make_currencies_table(self.codes)
+            else:
+                base = endpoint.removeprefix('/currencies/').removesuffix('.json')
+                if base not in self.codes:
+                    return None
+                data = make_rate_table(base, date, self.codes)
+            raw = json.dumps(data).encode()
+            etag = f'"{hashlib.sha1(raw).hexdigest()}"'
+            body = self._bodies[(date, endpoint)] = (raw, gzip.compress(raw), etag)
+        return body
+
+    async def handler(self, request: web.Request) -> web.Response:
+        match = PATH_RE.match(request.path)
+        if match is None:
+            raise web.HTTPNotFound()
+        _, date, endpoint = match.groups()
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.requests[self.error_status] += 1
+            return web.Response(status=self.error_status)
+        body = self._body(LATEST_DATE if date == 'latest' else date, endpoint)
+        if body is None:
+            self.requests[404] += 1
+            raise web.HTTPNotFound()
+        raw, compressed, etag = body
+        if request.headers.get('If-None-Match') == etag:
+            self.requests[304] += 1
+            return web.Response(status=304, headers={'ETag': etag})
+        self.requests[200] += 1
+        headers = {'ETag': etag}
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            raw, headers['Content-Encoding'] = compressed, 'gzip'
+        return web.Response(body=raw, content_type='application/json', headers=headers)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self.handler)
+        return app
+
+
+class StandInServer:
+    """
+    Run StandInApi on its own event loop thread, so sync converters can be benchmarked from the main thread.
+
+        with StandInServer(StandInApi(latency=0.01)) as server:
+            CurrencyConverter(exchange_api=server.exchange_api, fallback_apis=server.fallback_apis)
+    """
+
+    def __init__(self, api: StandInApi = None, host: str = '127.0.0.1', port: int = 0):
+        self.api = api or StandInApi()
+        self.host = host
+        self.port = port
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def exchange_api(self) -> str:
+        return f"{self.url}/api"
+
+    @property
+    def fallback_apis(self) -> list:
+        return [f"{self.url}/mirror/{{date}}"]
+
+    def start(self):
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        async def serve():
+            self._runner = web.AppRunner(self.api.make_app(), access_log=None)
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, self.host, self.port)
+            await site.start()
+            self.port = self._runner.addresses[0][1]
+            started.set()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(serve())
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='stand-in-exchange-api', daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help="response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="random extra delay in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of failed responses")
+    args = parser.parse_args()
+    api = StandInApi(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    web.run_app(api.make_app(), host='127.0.0.1', port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+from currency_exchange.cli import main
+
+main()
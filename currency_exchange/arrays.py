@@ -0,0 +1,139 @@
+import functools
+from array import array
+from datetime import date
+from typing import Sequence
+
+from currency_exchange.exceptions import CurrencyTypeError
+
+
+@functools.lru_cache(maxsize=None)
+def import_numpy():
+    """
+    numpy is imported on the first vectorized call, so importing the converter doesn't pay for it.
+
+    :return: numpy module or None if it isn't installed
+    """
+    try:
+        import numpy
+    except ImportError:  # numpy is optional, arrays are converted with array module without it
+        return None
+    return numpy
+
+
+def as_amounts(amounts):
+    """
+    Validate type of all amounts at once.
+
+    :param amounts: 1-D array or sequence of int or float amounts
+    :return: numpy float64 array if numpy is installed, otherwise array('d')
+    """
+    np = import_numpy()
+    if np is not None:
+        values = np.asarray(amounts)
+        if values.ndim != 1:
+            raise ValueError(f"amounts must be 1-D array. Got: {values.ndim}-D")
+        if values.dtype.kind not in 'iuf':
+            raise CurrencyTypeError(values.dtype.name)
+        return values.astype(np.float64, copy=False)
+    for amount in amounts:
+        if not isinstance(amount, (int, float)):
+            raise CurrencyTypeError(type(amount).__name__)
+    return array('d', amounts)
+
+
+def invalid_amounts(amounts) -> Sequence[int]:
+    """:return: indices of amounts which are not positive, including NaN"""
+    np = import_numpy()
+    if np is not None:
+        return np.flatnonzero(~(amounts > 0))
+    return [i for i, amount in enumerate(amounts) if not amount > 0]
+
+
+def _is_column(values) -> bool:
+    return values is not None and not isinstance(values, (str, date))
+
+
+def factorize(columns: list, size: int) -> tuple:
+    """
+    Group rows by distinct combination of column values, so every distinct key is resolved once.
+
+    :param columns: scalar values (the same for every row) or sequences of length size
+    :return: tuple: (list of distinct key tuples, index of the first row of every key, key index of every row)
+    """
+    np = import_numpy()
+    if np is not None:
+        columns = [_as_array(column) if _is_column(column) else column for column in columns]
+    arrays = [column for column in columns if _is_column(column)]
+    for column in arrays:
+        if len(column) != size:
+            raise ValueError(f"currency codes and dates must have the same length as amounts. Got: {len(column)}")
+    if np is not None:
+        codes = np.zeros(size, dtype=np.int64)
+        for column in arrays:
+            uniques, inverse = np.unique(column, return_inverse=True)
+            codes = codes * len(uniques) + inverse.reshape(-1)
+        _, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+    else:
+        index, first, inverse = {}, [], array('q')
+        for i, key in enumerate(zip(*arrays) if arrays else [()] * size):
+            if key not in index:
+                index[key] = len(first)
+                first.append(i)
+            inverse.append(index[key])
+    keys = [tuple(_value(column[i]) if _is_column(column) else column for column in columns) for i in first]
+    return keys, first, inverse
+
+
+def _as_array(column):
+    np = import_numpy()
+    values = np.asarray(column)
+    # datetime64 of any unit is reduced to days, items of datetime64[D] array are date objects
+    return values.astype('datetime64[D]') if values.dtype.kind == 'M' else values
+
+
+def _value(value):
+    np = import_numpy()
+    return value.item() if np is not None and isinstance(value, np.generic) else value
+
+
+def _round_cents(values):
+    """
+    Round float64 array to 2 decimals in place exactly like Python round(value, 2).
+
+    np.round scales values by 100 and rounds half to even, which differs from round() on values close to a half cent
+    (e.g. 767.03 * 1.5), only those few are rounded with round().
+    """
+    np = import_numpy()
+    scaled = values * 100
+    fraction = scaled - np.floor(scaled)
+    halves = np.flatnonzero(np.abs(fraction - 0.5) <= 4 * np.spacing(np.abs(scaled)))
+    exact = [round(float(values[i]), 2) for i in halves]
+    np.round(values, 2, out=values)
+    values[halves] = exact
+    return values
+
+
+def apply_rates(amounts, rates: Sequence[float], inverse, out=None):
+    """
+    result[i] = round(amounts[i] * rates[inverse[i]], 2), rounded the same way as convert on both paths.
+
+    :param rates: rate of every distinct key, NaN for failed ones
+    :param out: preallocated float64 array of the same length as amounts
+    :return: out or new float64 array (array('d') without numpy)
+    """
+    np = import_numpy()
+    if out is not None and len(out) != len(amounts):
+        raise ValueError(f"out must have the same length as amounts. Got: {len(out)} != {len(amounts)}")
+    if np is not None:
+        rates = np.asarray(rates, dtype=np.float64)
+        if out is None:
+            out = np.empty(len(amounts), dtype=np.float64)
+        np.take(rates, inverse, out=out)
+        np.multiply(out, amounts, out=out)
+        return _round_cents(out)
+    if out is None:
+        out = array('d', bytes(8 * len(amounts)))
+    for i, (amount, key) in enumerate(zip(amounts, inverse)):
+        out[i] = round(amount * rates[key], 2)
+    return out
@@ -0,0 +1,115 @@
+import argparse
+import contextlib
+import sys
+from typing import Optional
+
+from currency_exchange.converter import CurrencyConverter
+from currency_exchange.pipeline import FORMATS, RowWriter, convert_stream, detect_format, read_rows
+from currency_exchange.series import date_range
+from currency_exchange.transport import HTTP_BACKENDS
+
+
+def _open(path: str, mode: str):
+    if path == '-':
+        return contextlib.nullcontext(sys.stdin if 'r' in mode else sys.stdout)
+    return open(path, mode, newline='', encoding='utf-8')
+
+
+def _progress(rows: int, elapsed: float):
+    sys.stderr.write(f"\rConverted {rows} rows, {rows / elapsed if elapsed else 0:.0f} rows/s")
+    sys.stderr.flush()
+
+
+def convert_command(args: argparse.Namespace, currency_client: CurrencyConverter):
+    input_format = args.format or detect_format(args.input)
+    output_format = args.output_format or detect_format(args.output, default=input_format)
+    with _open(args.input, 'r') as input_file, _open(args.output, 'w') as output_file:
+        writer = RowWriter(output_file, output_format)
+        rows = convert_stream(
+            currency_client,
+            read_rows(input_file, input_format),
+            args.to,
+            amount_field=args.amount_field,
+            currency_field=args.currency_field,
+            date_field=args.date_field,
+            output_field=args.output_field,
+            chunk_size=args.chunk_size,
+            max_concurrency=args.max_concurrency,
+            errors=args.errors,
+            progress=None if args.quiet else _progress,
+        )
+        for row in rows:
+            writer.write(row)
+    if not args.quiet:
+        sys.stderr.write('\n')
+
+
+def rate_command(args: argparse.Namespace, currency_client: CurrencyConverter):
+    if args.amount is not None:
+        print(currency_client.convert(args.amount, args.currency_to_exchange, args.currency_to_get))
+    else:
+        print(currency_client.get_exchange_rate(args.currency_to_exchange, args.currency_to_get))
+
+
+def snapshot_command(args: argparse.Namespace, currency_client: CurrencyConverter):
+    dates = date_range(args.start, args.end, args.step)
+    tables = currency_client.build_snapshot(args.output, dates, args.bases.split(','), args.max_concurrency)
+    print(f"Written {tables} rate tables for {len(dates)} dates to {args.output}", file=sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='currency_exchange', description="Currency exchange rates and conversion")
+    parser.add_argument('--exchange-api', help="Exchange API URL, e.g. self-hosted mirror")
+    parser.add_argument('--date', default='latest', help="date of rates in YEAR-MONTH-DAY format or 'latest'")
+    parser.add_argument('--pivot', help="derive all cross rates from rate table of this currency")
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument(
+        '--http-backend', choices=HTTP_BACKENDS, default='stdlib', help="HTTP client, stdlib starts faster"
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help="convert amounts in CSV or JSON Lines file")
+    convert_parser.add_argument('input', help="input file, '-' for stdin")
+    convert_parser.add_argument('-o', '--output', default='-', help="output file, '-' for stdout")
+    convert_parser.add_argument('--to', required=True, help="target currency code")
+    convert_parser.add_argument('--format', choices=FORMATS, help="input format, detected by extension by default")
+    convert_parser.add_argument('--output-format', choices=FORMATS, help="output format, input format by default")
+    convert_parser.add_argument('--amount-field', default='amount')
+    convert_parser.add_argument('--currency-field', default='currency')
+    convert_parser.add_argument('--date-field', default='date')
+    convert_parser.add_argument('--output-field', help="field for converted amount, '{amount}_{to}' by default")
+    convert_parser.add_argument('--chunk-size', type=int, default=10_000)
+    convert_parser.add_argument('--max-concurrency', type=int, default=8)
+    convert_parser.add_argument('--errors', choices=('raise', 'skip', 'nan'), default='nan')
+    convert_parser.add_argument('-q', '--quiet', action='store_true', help="don't report progress")
+    convert_parser.set_defaults(handler=convert_command)
+
+    rate_parser = subparsers.add_parser('rate', help="print exchange rate or converted amount")
+    rate_parser.add_argument('currency_to_exchange')
+    rate_parser.add_argument('currency_to_get')
+    rate_parser.add_argument('amount', type=float, nargs='?')
+    rate_parser.set_defaults(handler=rate_command)
+
+    snapshot_parser = subparsers.add_parser('snapshot', help="download rate tables into offline snapshot file")
+    snapshot_parser.add_argument('output')
+    snapshot_parser.add_argument('--start', required=True)
+    snapshot_parser.add_argument('--end')
+    snapshot_parser.add_argument('--step', type=int, default=1)
+    snapshot_parser.add_argument('--bases', default='usd', help="comma separated base currency codes")
+    snapshot_parser.add_argument('--max-concurrency', type=int, default=8)
+    snapshot_parser.set_defaults(handler=snapshot_command)
+    return parser
+
+
+def main(argv: Optional[list] = None):
+    args = build_parser().parse_args(argv)
+    options = {'exchange_api': args.exchange_api} if args.exchange_api else {}
+    with CurrencyConverter(
+        currency_date=args.date, pivot_currency=args.pivot, http_backend=args.http_backend, **options
+    ) as currency_client:
+        currency_client.log_level = args.log_level
+        args.handler(args, currency_client)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,47 +1,121 @@
-from typing import Optional
+import asyncio
+import functools
+import inspect
+import logging
+import math
+import threading
+from datetime import date as date_type
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
 from dataclasses import dataclass, field
-from currency_exchange.data import ExchangeApiClient
+from currency_exchange.arrays import apply_rates, as_amounts, factorize, invalid_amounts
+from currency_exchange.currency_index import CurrencyIndex
+from currency_exchange.data import MINIMAL_SUPPORTED_DATE, ExchangeApiClient
 from currency_exchange.logger import LoggerConfig, LogLevel
-from currency_exchange.exceptions import CurrencyAmountValueError, CurrencyTypeError
+from currency_exchange.rate_matrix import RateMatrix
+from currency_exchange.series import RateSeries, date_range, float64_array
+from currency_exchange.snapshot import RateSnapshot, write_snapshot
+from currency_exchange.watch import RateSubscription, RateWatcher
+from currency_exchange.exceptions import CurrencyAmountValueError, CurrencyNotSupportedError, CurrencyTypeError
 
+if TYPE_CHECKING:  # multiprocessing.shared_memory is imported only by applications which use it
+    from currency_exchange.shared_store import SharedRateStore
 
-@dataclass
-class CurrencyConverter(ExchangeApiClient):
-    currencies_endpoint: str = field(default='/currencies/')
 
-    def __post_init__(self):
-        self.logger_config = LoggerConfig(name="CurrencyConverter", level=LogLevel.NOTSET)
-        self.logger = self.logger_config.get_logger()
+def _args_to_lowercase(func):
+    """
+    Simple decorator to make argument names lowercase.
+    """
 
-    def _args_to_lowercase(func):
-        """
-        Simple decorator to make argument names lowercase.
-        """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if kwargs:
+            kwargs = {k: v.lower() if isinstance(v, str) else v for k, v in kwargs.items()}
+        return func(*[arg.lower() if isinstance(arg, str) else arg for arg in args], **kwargs)
 
-        def wrapper(*args, **kwargs):
-            make_lowercase = lambda x: x.lower() if isinstance(x, str) else x
-            new_args = tuple(map(make_lowercase, args))
-            new_kwargs = {k: make_lowercase(v) for k, v in kwargs.items()}
-            return func(*new_args, **new_kwargs)
+    return wrapper
 
-        return wrapper
 
-    def validate_amount(func):
-        """
-        Decorator to validate that the first positional argument (amount) is an int or float.
-        """
+ERROR_POLICIES = ('raise', 'skip', 'nan')
+CURRENCIES_ENDPOINT = '/currencies.json'
+
+
+def _check_amount(currency_amount):
+    if not isinstance(currency_amount, (int, float)):
+        raise CurrencyTypeError(type(currency_amount).__name__)
+    if currency_amount <= 0:
+        raise CurrencyAmountValueError(amount=currency_amount)
+
 
-        def wrapper(*args, **kwargs):
-            # Assume the currency_amount is the first positional argument after self
+def validate_amount(func):
+    """
+    Decorator to validate that the first positional argument (amount) is an int or float.
+    For coroutine function the amount is validated when the coroutine is awaited, not when it's created.
+    """
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
             if len(args) > 1:
-                currency_amount = args[1]
-                if not isinstance(currency_amount, (int, float)):
-                    raise CurrencyTypeError(type(currency_amount).__name__)
-                if currency_amount <= 0:
-                    raise CurrencyAmountValueError(amount=currency_amount)
-            return func(*args, **kwargs)
+                _check_amount(args[1])
+            return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Assume the currency_amount is the first positional argument after self
+        if len(args) > 1:
+            _check_amount(args[1])
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _check_errors_policy(errors: str):
+    if errors not in ERROR_POLICIES:
+        raise ValueError(f"Invalid errors policy: {errors}. Must be one of: {', '.join(ERROR_POLICIES)}")
+
+
+def _apply_error_policy(results: list, errors: str) -> list:
+    """
+    :param results: values or exceptions in input order
+    :param errors: 'raise' - raise first exception, 'skip' - omit failed items, 'nan' - replace them with NaN
+    """
+    output = []
+    for result in results:
+        if isinstance(result, BaseException):
+            if errors == 'raise':
+                raise result
+            if errors == 'skip':
+                continue
+            result = float('nan')
+        output.append(result)
+    return output
+
+
+@dataclass
+class BaseCurrencyConverter(ExchangeApiClient):
+    """
+    Common logic of sync and async converters which doesn't depend on the way rate tables are fetched.
+    """
 
-        return wrapper
+    currencies_endpoint: str = field(default='/currencies/')
+    pivot_currency: Optional[str] = field(default=None, kw_only=True)
+    snapshot: Optional[RateSnapshot] = field(default=None, repr=False, kw_only=True)
+    shared_store: Optional['SharedRateStore'] = field(default=None, repr=False, kw_only=True)
+    validate_currencies: bool = field(default=False, kw_only=True)
+    currency_index: Optional[CurrencyIndex] = field(default=None, repr=False, kw_only=True)
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.logger_config = LoggerConfig(name="CurrencyConverter", level=LogLevel.NOTSET)
+        self.logger = self.logger_config.get_logger()
+        if self.pivot_currency is not None:
+            self.pivot_currency = self.pivot_currency.lower()
+        self._rate_matrices = {}
+        self._rate_matrices_lock = threading.Lock()
+        self._currency_indexes = (None, None)
+        self._watcher = None
 
     @property
     def log_level(self) -> LogLevel:
@@ -54,52 +128,685 @@ class CurrencyConverter(ExchangeApiClient):
         """
         self.logger_config.log_level = level
 
-    @_args_to_lowercase
-    def currencies(self, currency_code: Optional[str] = None):
-        """
-        :param currency_code: represents shortname of currency, e.g UAH, USD, EUR
-        :return: dict: supported currencies from API
-        """
-        all_currencies = self.get("/currencies.json")
+    def _currency_name(self, all_currencies: dict, currency_code: Optional[str] = None):
+        debug = self.logger.isEnabledFor(logging.DEBUG)
         if isinstance(currency_code, str):
-            self.logger.debug(f"Get currency name for code: {currency_code.upper()}")
+            if debug:
+                self.logger.debug("Get currency name for code: %s", currency_code.upper())
             try:
                 all_currencies[currency_code]
             except KeyError:
                 raise KeyError(f"{currency_code} is not a valid currency code or currency code is not supported")
             return all_currencies[currency_code]
-        else:
+        elif debug:
             self.logger.debug("Retrieving all supported currencies API call")
-            self.logger.debug(f"All supported currencies names: {all_currencies}")
-        return all_currencies
+            self.logger.debug("All supported currencies names: %s", all_currencies)
+        # the table is shared with the cache, callers get their own copy
+        return dict(all_currencies)
+
+    def _rate_endpoint(self, currency_to_exchange: str, currency_to_get: str) -> str:
+        endpoint = f"{self.currencies_endpoint}{self.pivot_currency or currency_to_exchange}.json"
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Currency for exchange: %s", currency_to_exchange.upper())
+            self.logger.debug("Currency to retrieve: %s", currency_to_get.upper())
+            self.logger.debug("Exchange endpoint API for exchange operation: %s", endpoint)
+        return endpoint
+
+    def _select_rate(self, rate_data: dict, currency_to_exchange: str, currency_to_get: str) -> float:
+        if self.pivot_currency is not None:
+            rate = self._rate_matrix(rate_data, self.pivot_currency).rate(currency_to_exchange, currency_to_get)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "Exchange rate from %s to %s via %s: %s",
+                    currency_to_exchange.upper(),
+                    currency_to_get.upper(),
+                    self.pivot_currency.upper(),
+                    rate,
+                )
+            return rate
+        rate = rate_data[currency_to_exchange][currency_to_get]
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "All exchange currencies rates for %s sell at %s: %s",
+                currency_to_exchange.upper(),
+                rate_data['date'],
+                rate_data[currency_to_exchange],
+            )
+            self.logger.debug(
+                "Exchange rate from %s to %s: %s", currency_to_exchange.upper(), currency_to_get.upper(), rate
+            )
+        return rate
+
+    def _lookup(self, select, *args) -> float:
+        """
+        Call rate selection function, timed as 'lookup' stage when metrics are enabled.
+        """
+        if self.metrics is None:
+            return select(*args)
+        with self.metrics.time('lookup'):
+            return select(*args)
+
+    def _exchange(self, currency_amount: float, rate: float, currency_to_exchange: str, currency_to_get: str):
+        exchange_result = round(currency_amount * rate, 2)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            sell, buy = currency_to_exchange.upper(), currency_to_get.upper()
+            self.logger.debug(
+                "Exchange operation: %s => %s | Currency to sell: %s | Currency to buy: %s "
+                "| Currency amount: %s | Rate: %s",
+                sell,
+                buy,
+                sell,
+                buy,
+                currency_amount,
+                rate,
+            )
+            self.logger.debug("Exchange operation: %s => %s: %s", sell, buy, exchange_result)
+        return exchange_result
+
+    def _snapshot_rate(self, currency_to_exchange: str, currency_to_get: str, currency_date: str) -> float:
+        rate = self.snapshot.rate(currency_to_exchange, currency_to_get, currency_date)
+        if math.isnan(rate):
+            raise KeyError(
+                f"Rate from {currency_to_exchange.upper()} to {currency_to_get.upper()} at {currency_date} "
+                f"is not available in snapshot {self.snapshot.path}"
+            )
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Exchange rate from %s to %s from snapshot: %s",
+                currency_to_exchange.upper(),
+                currency_to_get.upper(),
+                rate,
+            )
+        return rate
+
+    def _shared_rate(self, currency_to_exchange: str, currency_to_get: str, currency_date: str) -> Optional[float]:
+        rate = self.shared_store.rate(currency_to_exchange, currency_to_get, currency_date)
+        if rate is not None and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Exchange rate from %s to %s from shared store: %s",
+                currency_to_exchange.upper(),
+                currency_to_get.upper(),
+                rate,
+            )
+        return rate
+
+    def _rate_matrix(self, rate_data: dict, pivot: str) -> RateMatrix:
+        """
+        Matrix is built once per fetched pivot table and reused while the same table is served from cache.
+        """
+        key = (rate_data.get('date'), pivot)
+        with self._rate_matrices_lock:
+            cached = self._rate_matrices.get(key)
+            if cached is not None and cached[0] is rate_data:
+                return cached[1]
+            matrix = RateMatrix.from_table(rate_data, pivot)
+            self._rate_matrices[key] = (rate_data, matrix)
+            while len(self._rate_matrices) > max(self.cache_maxsize, 1):
+                del self._rate_matrices[next(iter(self._rate_matrices))]
+        return matrix
+
+    async def _arate_matrix(self, date=None, pivot: Optional[str] = None) -> RateMatrix:
+        pivot = (pivot or self.pivot_currency or 'usd').lower()
+        currency_date = self._date_str(date)
+        rate_data = await self._get(f"{self.currencies_endpoint}{pivot}.json", currency_date=currency_date)
+        return self._rate_matrix(rate_data, pivot)
+
+    def _index_from_table(self, all_currencies: dict) -> CurrencyIndex:
+        """
+        Index is rebuilt only when 'latest' currencies table is fetched again, e.g. after latest_ttl or refresh.
+        """
+        table, index = self._currency_indexes
+        if table is not all_currencies:
+            index = CurrencyIndex.from_table(all_currencies)
+            self._currency_indexes = (all_currencies, index)
+        return index
+
+    @staticmethod
+    def _check_codes(index: CurrencyIndex, *currency_codes: str):
+        """
+        :raises CurrencyNotSupportedError: currency code is missing in the index
+        """
+        for currency_code in currency_codes:
+            if currency_code not in index:
+                raise CurrencyNotSupportedError(
+                    f"{currency_code} is not a valid currency code or currency code is not supported"
+                )
+
+    async def _aload_currency_index(self) -> CurrencyIndex:
+        if self.currency_index is not None:
+            return self.currency_index
+        return self._index_from_table(await self._get(CURRENCIES_ENDPOINT, currency_date='latest'))
+
+    def _date_str(self, date=None) -> str:
+        """
+        :param date: date, datetime, string in 'YEAR-MONTH-DAY' format or 'latest', currency_date by default
+        """
+        if date is None:
+            return self.currency_date
+        if isinstance(date, date_type):
+            return date.strftime('%Y-%m-%d')
+        return str(date)
+
+    def _normalize_pair(self, currency_to_exchange: str, currency_to_get: str, currency_date=None) -> tuple:
+        return currency_to_exchange.lower(), currency_to_get.lower(), self._date_str(currency_date)
+
+    def _normalize_pairs(self, items: Iterable, offset: int = 0) -> list:
+        """
+        Normalize pairs of a batch, invalid item (e.g. None or NaN code, wrong length) gets TypeError in its slot
+        instead of aborting the whole batch.
+
+        :param offset: index of currency_to_exchange in items, e.g. 1 for (amount, currency_to_exchange, ...)
+        :return: list: normalized pair or exception for every item in input order
+        """
+        pairs = []
+        for item in items:
+            try:
+                pairs.append(self._normalize_pair(*item[offset:]))
+            except (TypeError, AttributeError) as err:
+                pairs.append(TypeError(f"Invalid currency pair {item!r}: {err}"))
+        return pairs
+
+    async def _fetch_tables(self, keys: Iterable[tuple], max_concurrency: Optional[int] = None) -> dict:
+        """
+        Fetch rate tables for distinct (currency_date, currency_to_exchange) keys concurrently.
+        :return: dict: key => rate table or exception raised while fetching it
+        """
+        keys = list(keys)
+        semaphore = asyncio.Semaphore(max_concurrency or max(len(keys), 1))
+
+        async def fetch(currency_date, currency_to_exchange):
+            endpoint = f"{self.currencies_endpoint}{currency_to_exchange}.json"
+            async with semaphore:
+                try:
+                    return await self._get(endpoint, currency_date=currency_date)
+                except Exception as err:
+                    # keep errors per table to not abort the whole batch
+                    return err
+
+        tables = await asyncio.gather(*(fetch(*key) for key in keys))
+        return dict(zip(keys, tables))
+
+    async def _resolve_rates(self, pairs: list, max_concurrency: Optional[int] = None) -> list:
+        """
+        :param pairs: normalized (currency_to_exchange, currency_to_get, currency_date) tuples or exceptions
+                      of invalid pairs, see _normalize_pairs
+        :return: list: rate or exception for every pair in input order
+        """
+        resolved = {i: pair for i, pair in enumerate(pairs) if isinstance(pair, BaseException)}
+        if self.snapshot is not None:
+            rates = []
+            for i, pair in enumerate(pairs):
+                if i in resolved:
+                    rates.append(resolved[i])
+                    continue
+                try:
+                    rates.append(self._snapshot_rate(*pair))
+                except KeyError as err:
+                    rates.append(err)
+            return rates
+
+        valid = {i: pair for i, pair in enumerate(pairs) if i not in resolved}
+        if self.validate_currencies:
+            index = await self._aload_currency_index()
+            for i, (currency_to_exchange, currency_to_get, _) in valid.items():
+                try:
+                    self._check_codes(index, currency_to_exchange, currency_to_get)
+                except CurrencyNotSupportedError as err:
+                    resolved[i] = err
+        if self.shared_store is not None:
+            for i, (currency_to_exchange, currency_to_get, currency_date) in valid.items():
+                if i not in resolved:
+                    rate = self.shared_store.rate(currency_to_exchange, currency_to_get, currency_date)
+                    if rate is not None:
+                        resolved[i] = rate
+
+        pivot = self.pivot_currency
+        keys = {(date, pivot or base) for i, (base, _, date) in valid.items() if i not in resolved}
+        tables = await self._fetch_tables(keys, max_concurrency)
+        self.logger.debug("Fetched %s rate tables for %s currency pairs", len(tables), len(pairs))
+        rates = []
+        for i, pair in enumerate(pairs):
+            if i in resolved:
+                rates.append(resolved[i])
+                continue
+            currency_to_exchange, currency_to_get, currency_date = pair
+            rate_data = tables[(currency_date, pivot or currency_to_exchange)]
+            if isinstance(rate_data, BaseException):
+                rates.append(rate_data)
+                continue
+            try:
+                if pivot is not None:
+                    rates.append(self._rate_matrix(rate_data, pivot).rate(currency_to_exchange, currency_to_get))
+                else:
+                    rates.append(rate_data[currency_to_exchange][currency_to_get])
+            except KeyError:
+                rates.append(
+                    KeyError(f"{currency_to_get} is not a valid currency code or currency code is not supported")
+                )
+        return rates
+
+    async def _aget_exchange_rates(self, pairs: Iterable[tuple], errors: str, max_concurrency: Optional[int]):
+        _check_errors_policy(errors)
+        pairs = self._normalize_pairs(pairs)
+        return _apply_error_policy(await self._resolve_rates(pairs, max_concurrency), errors)
+
+    async def _aget_rate_series(self, currency_to_exchange, currencies_to_get, start, end, step, max_concurrency):
+        currency_to_exchange = currency_to_exchange.lower()
+        if isinstance(currencies_to_get, str):
+            currencies_to_get = [currencies_to_get]
+        currencies_to_get = [code.lower() for code in currencies_to_get]
+        dates = date_range(start, end, step, minimal_date=MINIMAL_SUPPORTED_DATE.date())
+        self.logger.debug("Fetching %s rates for %s dates", currency_to_exchange.upper(), len(dates))
+        pairs = [(currency_to_exchange, code, date) for date in dates for code in currencies_to_get]
+        rates = await self._resolve_rates(pairs, max_concurrency)
+        series = RateSeries(base=currency_to_exchange, dates=dates)
+        width = len(currencies_to_get)
+        for i, code in enumerate(currencies_to_get):
+            column = rates[i::width]
+            series.rates[code] = float64_array(
+                float('nan') if isinstance(rate, BaseException) else rate for rate in column
+            )
+        return series
+
+    async def _awarm(self, dates: Iterable, currencies: Iterable[str], max_concurrency: Optional[int]) -> int:
+        currencies = [code.lower() for code in currencies]
+        keys = [(self._date_str(date), code) for date in dates for code in currencies]
+        tables = await self._fetch_tables(keys, max_concurrency)
+        failed = [key for key, rate_data in tables.items() if isinstance(rate_data, BaseException)]
+        if failed:
+            self.logger.warning("Failed to prefetch %s of %s rate tables: %s", len(failed), len(tables), failed)
+        return len(tables) - len(failed)
+
+    async def _abuild_snapshot(self, path: str, dates: Iterable, currencies: Iterable[str], max_concurrency) -> int:
+        currencies = [code.lower() for code in currencies]
+        keys = [(self._date_str(date), code) for date in dates for code in currencies]
+        tables = await self._fetch_tables(keys, max_concurrency)
+        tables = {key: rate_data for key, rate_data in tables.items() if not isinstance(rate_data, BaseException)}
+        if len(tables) < len(keys):
+            self.logger.warning(
+                "%s of %s rate tables are missing in snapshot %s", len(keys) - len(tables), len(keys), path
+            )
+        await asyncio.to_thread(write_snapshot, path, tables)
+        return len(tables)
+
+    async def _aconvert_array(
+        self, amounts, currencies_to_exchange, currencies_to_get, dates, errors: str, out, max_concurrency
+    ):
+        if errors not in ('raise', 'nan'):
+            raise ValueError(f"Invalid errors policy for arrays: {errors}. Must be one of: raise, nan")
+        amounts = as_amounts(amounts)
+        invalid = invalid_amounts(amounts)
+        if errors == 'raise' and len(invalid):
+            raise CurrencyAmountValueError(amount=float(amounts[invalid[0]]))
+        keys, first, inverse = factorize([currencies_to_exchange, currencies_to_get, dates], len(amounts))
+        pairs = self._normalize_pairs(keys)
+        rates = await self._resolve_rates(pairs, max_concurrency)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Resolved %s distinct rates for %s amounts", len(pairs), len(amounts))
+        failed = [i for i, rate in enumerate(rates) if isinstance(rate, BaseException)]
+        if errors == 'raise' and failed:
+            raise rates[min(failed, key=lambda i: first[i])]
+        for i in failed:
+            rates[i] = math.nan
+        result = apply_rates(amounts, rates, inverse, out)
+        for i in invalid:
+            result[i] = math.nan
+        return result
+
+    async def _awatch(
+        self, pairs: Iterable[tuple], interval: float, threshold: float, callback: Optional[Callable]
+    ) -> RateSubscription:
+        if interval <= 0 or threshold < 0:
+            raise ValueError(f"interval must be positive and threshold non-negative. Got: {interval}, {threshold}")
+        if self._watcher is None:
+            self._watcher = RateWatcher(
+                fetch=lambda endpoint: self._request(endpoint, currency_date='latest'),
+                select=self._select_rate,
+                logger=self.logger,
+                dispatch=self._dispatch,
+            )
+        watched = []
+        for currency_to_exchange, currency_to_get in pairs:
+            currency_to_exchange, currency_to_get = currency_to_exchange.lower(), currency_to_get.lower()
+            endpoint = self._rate_endpoint(currency_to_exchange, currency_to_get)
+            watched.append(
+                (currency_to_exchange, currency_to_get, endpoint, self.pivot_currency or currency_to_exchange)
+            )
+        return self._watcher.subscribe(watched, interval, threshold, callback)
+
+    async def aclose(self):
+        if self._watcher is not None:
+            await self._watcher.stop()
+        await super().aclose()
+
+    async def _aconvert_many(self, requests: Iterable[tuple], errors: str, max_concurrency: Optional[int]):
+        _check_errors_policy(errors)
+        requests = list(requests)
+        pairs = self._normalize_pairs(requests, offset=1)
+        rates = await self._resolve_rates(pairs, max_concurrency)
+        results = []
+        for request, pair, rate in zip(requests, pairs, rates):
+            if isinstance(pair, BaseException):
+                results.append(pair)
+                continue
+            try:
+                _check_amount(request[0])
+            except (CurrencyTypeError, CurrencyAmountValueError) as err:
+                rate = err
+            results.append(rate if isinstance(rate, BaseException) else round(request[0] * rate, 2))
+        return _apply_error_policy(results, errors)
+
+
+@dataclass
+class CurrencyConverter(BaseCurrencyConverter):
+    """
+    Sync converter. It's thread-safe: one instance can be shared by all threads of the process (e.g. WSGI workers),
+    calls from all threads are served by one background event loop thread and share connection pool, caches and
+    in-flight requests. Pass date= to the calls instead of changing currency_date of the shared instance.
+
+        currency_client = CurrencyConverter()
+        rate = currency_client.get_exchange_rate('usd', 'uah', date='2024-11-20')
+    """
 
     @_args_to_lowercase
-    def get_exchange_rate(self, currency_to_exchange: str, currency_to_get: str):
-        self.logger.debug(f"Currency for exchange: {currency_to_exchange.upper()}")
-        self.logger.debug(f"Currency to retrieve: {currency_to_get.upper()}")
-        endpoint = f"{self.currencies_endpoint}{currency_to_exchange}.json"
-        self.logger.debug(f"Exchange endpoint API for exchange operation: {endpoint}")
-        rate_data = self.get(endpoint)
-        self.logger.debug(
-            f"All exchange currencies rates for {currency_to_exchange.upper()} sell at "
-            f"{rate_data['date']}: {rate_data[currency_to_exchange]}"
+    def currencies(self, currency_code: Optional[str] = None, date=None):
+        """
+        :param currency_code: represents shortname of currency, e.g UAH, USD, EUR
+        :param date: date of currencies list, currency_date of the converter by default
+        :return: dict: supported currencies from API
+        """
+        return self._currency_name(self.get(CURRENCIES_ENDPOINT, currency_date=self._date_str(date)), currency_code)
+
+    def _load_currency_index(self) -> CurrencyIndex:
+        if self.currency_index is not None:
+            return self.currency_index
+        return self._index_from_table(self.get(CURRENCIES_ENDPOINT, currency_date='latest'))
+
+    def search_currencies(self, query: str, limit: int = 10) -> list:
+        """
+        Autocomplete currencies by code or name prefix from local index, e.g. search_currencies('dol')
+
+        :return: list: (code, name) tuples, see CurrencyIndex.search
+        """
+        return self._load_currency_index().search(query, limit)
+
+    @_args_to_lowercase
+    def get_exchange_rate(self, currency_to_exchange: str, currency_to_get: str, date=None):
+        """
+        :param date: date of rate as string in 'YEAR-MONTH-DAY' format, date or 'latest',
+                     currency_date of the converter by default
+        """
+        currency_date = self._date_str(date)
+        if self.snapshot is not None:
+            return self._lookup(self._snapshot_rate, currency_to_exchange, currency_to_get, currency_date)
+        if self.shared_store is not None:
+            rate = self._lookup(self._shared_rate, currency_to_exchange, currency_to_get, currency_date)
+            if rate is not None:
+                return rate
+        if self.validate_currencies:
+            self._check_codes(self._load_currency_index(), currency_to_exchange, currency_to_get)
+        endpoint = self._rate_endpoint(currency_to_exchange, currency_to_get)
+        rate_data = self.get(endpoint, currency_date=currency_date)
+        return self._lookup(self._select_rate, rate_data, currency_to_exchange, currency_to_get)
+
+    @validate_amount
+    def convert(self, currency_amount: float, currency_to_exchange: str, currency_to_get: str, date=None) -> float:
+        rate = self.get_exchange_rate(currency_to_exchange, currency_to_get, date=date)
+        return self._exchange(currency_amount, rate, currency_to_exchange, currency_to_get)
+
+    def get_exchange_rates(self, pairs: Iterable[tuple], errors: str = 'raise', max_concurrency: int = None) -> list:
+        """
+        Get exchange rates for many currency pairs, every distinct rate table is fetched once.
+
+        :param pairs: (currency_to_exchange, currency_to_get) or (currency_to_exchange, currency_to_get, date) tuples
+        :param errors: 'raise' - raise first error, 'skip' - omit failed pairs, 'nan' - return NaN for failed pairs
+        :param max_concurrency: max number of rate tables fetched at the same time
+        :return: list: rates in input order
+        """
+        return self._run(self._aget_exchange_rates(pairs, errors, max_concurrency))
+
+    def get_rate_series(
+        self, currency_to_exchange: str, currencies_to_get, start, end=None, step=1, max_concurrency: int = 8
+    ) -> RateSeries:
+        """
+        Get historical rates for date range, rate tables are fetched concurrently.
+
+        :param currency_to_exchange: base currency code
+        :param currencies_to_get: quote currency code or list of codes
+        :param start: first date, clamped to minimal date supported by Exchange API
+        :param end: last date (inclusive), today by default
+        :param step: days between dates, int or timedelta
+        :param max_concurrency: max number of rate tables fetched at the same time
+        :return: RateSeries: dates and float64 array of rates per quote currency, missing rates are NaN
+        """
+        return self._run(
+            self._aget_rate_series(currency_to_exchange, currencies_to_get, start, end, step, max_concurrency)
         )
-        self.logger.debug(
-            f"Exchange rate from {currency_to_exchange.upper()} to {currency_to_get.upper()}: "
-            f"{ rate_data[currency_to_exchange][currency_to_get]}"
+
+    def warm(self, dates: Iterable, currencies: Iterable[str], max_concurrency: int = 8) -> int:
+        """
+        Prefetch rate tables for every date and base currency into cache and rate_store.
+
+        :param dates: dates of rates, e.g. from currency_exchange.series.date_range
+        :param currencies: base currency codes
+        :param max_concurrency: max number of rate tables fetched at the same time
+        :return: int: number of available tables
+        """
+        return self._run(self._awarm(dates, currencies, max_concurrency))
+
+    def build_snapshot(self, path: str, dates: Iterable, currencies: Iterable[str], max_concurrency: int = 8) -> int:
+        """
+        Download rate tables for every date and base currency into a memory-mapped snapshot file,
+        which can be used for offline conversions: CurrencyConverter(snapshot=RateSnapshot(path))
+
+        :param path: snapshot file path
+        :param dates: dates of rates, e.g. from currency_exchange.series.date_range
+        :param currencies: base currency codes
+        :param max_concurrency: max number of rate tables fetched at the same time
+        :return: int: number of tables written to the snapshot
+        """
+        return self._run(self._abuild_snapshot(path, dates, currencies, max_concurrency))
+
+    def rate_matrix(self, date=None, pivot: Optional[str] = None) -> RateMatrix:
+        """
+        Rates of all currencies against pivot currency for vectorized cross rates lookups, e.g.
+        currency_client.rate_matrix().cross_rates(['usd', 'eur'], ['uah', 'gbp'])
+
+        :param date: date of rates, currency_date of the converter by default
+        :param pivot: pivot currency, pivot_currency of the converter or USD by default
+        :return: RateMatrix
+        """
+        return self._run(self._arate_matrix(date, pivot))
+
+    def convert_many(self, requests: Iterable[tuple], errors: str = 'raise', max_concurrency: int = None) -> list:
+        """
+        Convert many amounts, every distinct rate table is fetched once.
+
+        :param requests: (amount, currency_to_exchange, currency_to_get) or
+                         (amount, currency_to_exchange, currency_to_get, date) tuples
+        :param errors: 'raise' - raise first error, 'skip' - omit failed items, 'nan' - return NaN for failed items
+        :param max_concurrency: max number of rate tables fetched at the same time
+        :return: list: converted amounts in input order
+        """
+        return self._run(self._aconvert_many(requests, errors, max_concurrency))
+
+    def convert_array(
+        self,
+        amounts,
+        currencies_to_exchange,
+        currencies_to_get,
+        dates=None,
+        errors: str = 'raise',
+        out=None,
+        max_concurrency: int = None,
+    ):
+        """
+        Vectorized conversion of a whole column of amounts: amounts are validated at once, every distinct
+        (currency_to_exchange, currency_to_get, date) rate is resolved once, then rates are gathered, multiplied
+        and rounded to 2 decimals over the whole array.
+
+            currency_client.convert_array(np.array([100, 250.5]), 'usd', np.array(['uah', 'eur']))
+
+        :param amounts: 1-D numpy array or sequence of int or float amounts
+        :param currencies_to_exchange: currency code or array of codes of the same length as amounts
+        :param currencies_to_get: currency code or array of codes of the same length as amounts
+        :param dates: date or array of dates (strings, date objects or datetime64), currency_date by default
+        :param errors: 'raise' - raise first error, 'nan' - return NaN for failed items
+        :param out: preallocated float64 array of the same length as amounts for the result
+        :param max_concurrency: max number of rate tables fetched at the same time
+        :return: numpy float64 array (out if given), array('d') if numpy isn't installed
+        """
+        return self._run(
+            self._aconvert_array(
+                amounts, currencies_to_exchange, currencies_to_get, dates, errors, out, max_concurrency
+            )
         )
-        return rate_data[currency_to_exchange][currency_to_get]
+
+    def watch(
+        self,
+        pairs: Iterable[tuple],
+        callback: Callable[[list], None],
+        interval: float = 60.0,
+        threshold: float = 0.0,
+    ) -> RateSubscription:
+        """
+        Watch 'latest' rates of currency pairs. Subscriptions of the converter share one poller per rate table,
+        each poll diffs the new table against the previous one and reports only pairs that changed.
+
+        :param pairs: (currency_to_exchange, currency_to_get) tuples
+        :param callback: called with list of RateChange from the callbacks thread of the converter, one call at a time,
+                         it may call the converter back
+        :param interval: seconds between polls
+        :param threshold: min relative move since the last reported rate, e.g. 0.001 for 0.1%, any change by default
+        :return: RateSubscription: call close() to stop watching
+        """
+        return self._run(self._awatch(pairs, interval, threshold, callback))
+
+
+@dataclass
+class AsyncCurrencyConverter(BaseCurrencyConverter):
+    """
+    Converter for usage inside of running event loop. All calls share one HTTP session and connection pool,
+    use it as async context manager or call aclose() to release connections.
+
+        async with AsyncCurrencyConverter() as currency_client:
+            rate = await currency_client.get_exchange_rate('usd', 'uah')
+    """
+
+    @_args_to_lowercase
+    async def currencies(self, currency_code: Optional[str] = None, date=None):
+        """
+        :param currency_code: represents shortname of currency, e.g UAH, USD, EUR
+        :param date: date of currencies list, currency_date of the converter by default
+        :return: dict: supported currencies from API
+        """
+        all_currencies = await self._get(CURRENCIES_ENDPOINT, currency_date=self._date_str(date))
+        return self._currency_name(all_currencies, currency_code)
+
+    async def search_currencies(self, query: str, limit: int = 10) -> list:
+        """
+        Autocomplete currencies by code or name prefix from local index, see CurrencyConverter.search_currencies
+        """
+        return (await self._aload_currency_index()).search(query, limit)
+
+    @_args_to_lowercase
+    async def get_exchange_rate(self, currency_to_exchange: str, currency_to_get: str, date=None):
+        """
+        :param date: date of rate as string in 'YEAR-MONTH-DAY' format, date or 'latest',
+                     currency_date of the converter by default
+        """
+        currency_date = self._date_str(date)
+        if self.snapshot is not None:
+            return self._lookup(self._snapshot_rate, currency_to_exchange, currency_to_get, currency_date)
+        if self.shared_store is not None:
+            rate = self._lookup(self._shared_rate, currency_to_exchange, currency_to_get, currency_date)
+            if rate is not None:
+                return rate
+        if self.validate_currencies:
+            self._check_codes(await self._aload_currency_index(), currency_to_exchange, currency_to_get)
+        endpoint = self._rate_endpoint(currency_to_exchange, currency_to_get)
+        rate_data = await self._get(endpoint, currency_date=currency_date)
+        return self._lookup(self._select_rate, rate_data, currency_to_exchange, currency_to_get)
 
     @validate_amount
-    def convert(self, currency_amount: float, currency_to_exchange: str, currency_to_get: str) -> float:
-        rate = self.get_exchange_rate(currency_to_exchange, currency_to_get)
-        exchange_result = round(currency_amount * rate, 2)
-        self.logger.debug(
-            f"Exchange operation: {currency_to_exchange.upper()} => {currency_to_get.upper()} "
-            f"| Currency to sell: {currency_to_exchange.upper()} | Currency to buy: {currency_to_get.upper()} "
-            f"| Currency amount: {currency_amount} | Rate: {rate}"
-        )
-        self.logger.debug(
-            f"Exchange operation: {currency_to_exchange.upper()} => {currency_to_get.upper()}: {exchange_result}"
+    async def convert(
+        self, currency_amount: float, currency_to_exchange: str, currency_to_get: str, date=None
+    ) -> float:
+        rate = await self.get_exchange_rate(currency_to_exchange, currency_to_get, date=date)
+        return self._exchange(currency_amount, rate, currency_to_exchange, currency_to_get)
+
+    async def get_exchange_rates(
+        self, pairs: Iterable[tuple], errors: str = 'raise', max_concurrency: int = None
+    ) -> list:
+        """
+        Get exchange rates for many currency pairs, see CurrencyConverter.get_exchange_rates
+        """
+        return await self._aget_exchange_rates(pairs, errors, max_concurrency)
+
+    async def get_rate_series(
+        self, currency_to_exchange: str, currencies_to_get, start, end=None, step=1, max_concurrency: int = 8
+    ) -> RateSeries:
+        """
+        Get historical rates for date range, see CurrencyConverter.get_rate_series
+        """
+        return await self._aget_rate_series(currency_to_exchange, currencies_to_get, start, end, step, max_concurrency)
+
+    async def warm(self, dates: Iterable, currencies: Iterable[str], max_concurrency: int = 8) -> int:
+        """
+        Prefetch rate tables into cache and rate_store, see CurrencyConverter.warm
+        """
+        return await self._awarm(dates, currencies, max_concurrency)
+
+    async def build_snapshot(
+        self, path: str, dates: Iterable, currencies: Iterable[str], max_concurrency: int = 8
+    ) -> int:
+        """
+        Download rate tables into a memory-mapped snapshot file, see CurrencyConverter.build_snapshot
+        """
+        return await self._abuild_snapshot(path, dates, currencies, max_concurrency)
+
+    async def rate_matrix(self, date=None, pivot: Optional[str] = None) -> RateMatrix:
+        """
+        Rates of all currencies against pivot currency, see CurrencyConverter.rate_matrix
+        """
+        return await self._arate_matrix(date, pivot)
+
+    async def convert_many(self, requests: Iterable[tuple], errors: str = 'raise', max_concurrency: int = None) -> list:
+        """
+        Convert many amounts, see CurrencyConverter.convert_many
+        """
+        return await self._aconvert_many(requests, errors, max_concurrency)
+
+    async def convert_array(
+        self,
+        amounts,
+        currencies_to_exchange,
+        currencies_to_get,
+        dates=None,
+        errors: str = 'raise',
+        out=None,
+        max_concurrency: int = None,
+    ):
+        """
+        Vectorized conversion of a whole column of amounts, see CurrencyConverter.convert_array
+        """
+        return await self._aconvert_array(
+            amounts, currencies_to_exchange, currencies_to_get, dates, errors, out, max_concurrency
         )
-        return exchange_result
+
+    async def watch(
+        self,
+        pairs: Iterable[tuple],
+        callback: Optional[Callable[[list], None]] = None,
+        interval: float = 60.0,
+        threshold: float = 0.0,
+    ) -> RateSubscription:
+        """
+        Watch 'latest' rates of currency pairs, see CurrencyConverter.watch. Without callback the subscription is
+        async iterator of lists of RateChange:
+
+            async with await currency_client.watch([('usd', 'eur')], interval=30) as changes_stream:
+                async for changes in changes_stream:
+                    ...
+        """
+        return await self._awatch(pairs, interval, threshold, callback)
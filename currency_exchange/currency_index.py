@@ -0,0 +1,88 @@
+import bisect
+import json
+import os
+from itertools import islice
+from operator import itemgetter
+from typing import Iterator
+
+
+class CurrencyIndex:
+    """
+    In-memory index of supported currency codes for O(1) validation and prefix search by code or name.
+
+    Built from /currencies.json table of Exchange API, can be saved to a JSON file and bundled with an application
+    to validate codes on cold start without network:
+
+        CurrencyIndex.from_table(currency_client.currencies()).save('currencies.json')
+        CurrencyConverter(validate_currencies=True, currency_index=CurrencyIndex.load('currencies.json'))
+    """
+
+    def __init__(self, names: dict):
+        """
+        :param names: currency code => currency name, e.g. {'usd': 'US Dollar'}
+        """
+        self.names = {code.lower(): name for code, name in names.items()}
+        self.codes = sorted(self.names)
+        self._words = sorted(
+            (word, code) for code, name in self.names.items() for word in set(str(name).lower().split())
+        )
+
+    @classmethod
+    def from_table(cls, all_currencies: dict) -> 'CurrencyIndex':
+        """
+        :param all_currencies: currencies table as returned by Exchange API, e.g /currencies.json
+        """
+        return cls(all_currencies)
+
+    @classmethod
+    def load(cls, path: str) -> 'CurrencyIndex':
+        with open(path, encoding='utf-8') as index_file:
+            return cls(json.load(index_file))
+
+    def save(self, path: str):
+        tmp_path = f"{os.fspath(path)}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as index_file:
+            json.dump(self.names, index_file, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def __contains__(self, currency_code: str) -> bool:
+        return currency_code in self.names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def name(self, currency_code: str) -> str:
+        try:
+            return self.names[currency_code.lower()]
+        except KeyError:
+            raise KeyError(f"{currency_code} is not a valid currency code or currency code is not supported")
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """
+        Autocomplete currencies: codes starting with query go first, then currencies with a word of the name
+        starting with query, e.g. 'dol' matches 'US Dollar'.
+
+        :param query: code or name prefix, case-insensitive
+        :param limit: max number of results
+        :return: list: (code, name) tuples
+        """
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+        found = dict.fromkeys(islice(_prefixed(self.codes, query, query), limit))
+        for _, code in _prefixed(self._words, (query,), query, key=itemgetter(0)):
+            if len(found) >= limit:
+                break
+            found.setdefault(code)
+        return [(code, self.names[code]) for code in found]
+
+
+def _prefixed(items: list, start, prefix: str, key=None) -> Iterator:
+    """
+    Items of sorted list which start with prefix, the first one is found by binary search.
+    :param start: value to bisect items with
+    """
+    for i in range(bisect.bisect_left(items, start), len(items)):
+        if not (items[i] if key is None else key(items[i])).startswith(prefix):
+            break
+        yield items[i]
@@ -1,28 +1,112 @@
 import asyncio
-import aiohttp
-from aiohttp.web_exceptions import HTTPError
+import logging
+import threading
+import time
+import weakref
 from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Callable, Optional
+from currency_exchange.cache import RateCache
+from currency_exchange.metrics import Metrics
+from currency_exchange.refresh import LatestRefresher
+from currency_exchange.runner import BackgroundLoop
+from currency_exchange.singleflight import SingleFlight
+from currency_exchange.store import SQLiteRateStore
+from currency_exchange.transport import HTTP_BACKENDS, AiohttpTransport, LatencyTracker, StdlibTransport, backoff_delay
 from currency_exchange.logger import LoggerConfig, LogLevel
-from currency_exchange.exceptions import CustomDateMismatchException
-from aiohttp.client_exceptions import ClientResponseError
+from currency_exchange.exceptions import CurrencyNotSupportedError, CustomDateMismatchException, ExchangeApiError
+
+MINIMAL_SUPPORTED_DATE = datetime(2024, 3, 2)
+BASE_URLS_MAXSIZE = 4096
+EXCHANGE_API = 'https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api'
+FALLBACK_API = 'https://{date}.currency-api.pages.dev'
 
 
 @dataclass
 class ExchangeApiClient:
-    exchange_api: str = field(default='https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api')
+    exchange_api: str = field(default=EXCHANGE_API)
+    fallback_apis: Optional[list] = field(default=None, kw_only=True)
     currency_date: str = field(default='latest')
     api_version: str = field(default='v1')
-    headers: dict = field(default_factory=lambda: {"Content-Type": "application/json"})
+    headers: dict = field(default_factory=lambda: {"Accept": "application/json"})
+    cache_maxsize: int = field(default=128, kw_only=True)
+    latest_ttl: float = field(default=300.0, kw_only=True)
+    connection_limit: int = field(default=100, kw_only=True)
+    connection_limit_per_host: int = field(default=0, kw_only=True)
+    keepalive_timeout: float = field(default=30.0, kw_only=True)
+    validators_maxsize: int = field(default=256, kw_only=True)
+    http_backend: str = field(default='aiohttp', kw_only=True)
+    request_timeout: float = field(default=10.0, kw_only=True)
+    max_retries: int = field(default=2, kw_only=True)
+    backoff_base: float = field(default=0.1, kw_only=True)
+    backoff_max: float = field(default=2.0, kw_only=True)
+    hedge: bool = field(default=False, kw_only=True)
+    hedge_percentile: float = field(default=0.95, kw_only=True)
+    rate_store: Optional[SQLiteRateStore] = field(default=None, repr=False, kw_only=True)
+    refresh_interval: Optional[float] = field(default=None, kw_only=True)
+    max_staleness: float = field(default=3600.0, kw_only=True)
+    on_refresh_error: Optional[Callable] = field(default=None, repr=False, kw_only=True)
+    metrics: Optional[Metrics] = field(default=None, repr=False, kw_only=True)
     logger_config: LoggerConfig = field(init=False)
+    cache: RateCache = field(init=False, repr=False)
 
     def __post_init__(self):
         self.logger_config = LoggerConfig(name="CurrencyConverter", level=LogLevel.NOTSET)
         self.logger = self.logger_config.get_logger()
+        self.cache = RateCache(maxsize=self.cache_maxsize)
+        if self.fallback_apis is None:
+            # the public mirror serves the same data as the default API only, not a self-hosted one
+            self.fallback_apis = [FALLBACK_API] if self.exchange_api == EXCHANGE_API else []
+        if self.http_backend not in HTTP_BACKENDS:
+            raise ValueError(f"Invalid http_backend: {self.http_backend}. Must be one of: {', '.join(HTTP_BACKENDS)}")
+        if self.max_retries < 0:
+            raise ValueError(f"max_retries must be non-negative. Got: {self.max_retries}")
+        if self.http_backend == 'stdlib':
+            self.transport = StdlibTransport(
+                headers=self.headers,
+                limit=self.connection_limit,
+                keepalive_timeout=self.keepalive_timeout,
+                metrics=self.metrics,
+                validators_maxsize=self.validators_maxsize,
+            )
+        else:
+            self.transport = AiohttpTransport(
+                headers=self.headers,
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                metrics=self.metrics,
+                validators_maxsize=self.validators_maxsize,
+            )
+        self._base_urls = {}
+        self._latencies = LatencyTracker()
+        self._inflight = SingleFlight()
+        self._background_loop = None
+        self._background_loop_lock = threading.Lock()
+        self._refresher = None
+        if self.refresh_interval is not None:
+            if self.refresh_interval >= self.max_staleness:
+                raise ValueError(
+                    f"refresh_interval must be less than max_staleness. "
+                    f"Got: {self.refresh_interval} >= {self.max_staleness}"
+                )
+            self._refresher = LatestRefresher(
+                refresh=self._refresh_latest,
+                interval=self.refresh_interval,
+                on_error=self.on_refresh_error,
+                logger=self.logger,
+                dispatch=self._dispatch,
+            )
+
+    async def _refresh_latest(self, endpoint: str):
+        """
+        Refresh callback of LatestRefresher, a bound method so the refresher can hold it by weak reference.
+        """
+        return await self._request(endpoint, currency_date='latest')
 
     @staticmethod
     def check_date(target_date):
-        minimal_supported_date = datetime(2024, 3, 2)
+        minimal_supported_date = MINIMAL_SUPPORTED_DATE
 
         if target_date.year < minimal_supported_date.year:
             raise CustomDateMismatchException(actual_d=target_date)
@@ -44,47 +128,262 @@ class ExchangeApiClient:
           Function that build base_url in proper format for further usage
         :return: str: base_url
         """
-        if self.currency_date != 'latest':
+        return self._build_base_url(self.currency_date)
+
+    def _build_base_url(self, currency_date: str) -> str:
+        """
+        Date is validated and base_url is built once per date value, only failed validation is repeated.
+
+        :param currency_date: date in 'YEAR-MONTH-DAY' format or special value 'latest'
+        :return: str: base_url for particular date
+        """
+        key = (self.exchange_api, self.api_version, currency_date)
+        base_url = self._base_urls.get(key)
+        if base_url is not None:
+            return base_url
+        if currency_date != 'latest':
             try:
-                _date_obj = datetime.strptime(str(self.currency_date), '%Y-%m-%d')
+                _date_obj = datetime.strptime(str(currency_date), '%Y-%m-%d')
                 self.check_date(_date_obj)
             except ValueError:
                 raise ValueError(
-                    f"Incorrect data format for currency_date {self.currency_date}, "
+                    f"Incorrect data format for currency_date {currency_date}, "
                     f"allowed formats: 'YEAR-MONTH-DAY' or special value 'latest'. e.g '2024-11-20'"
                 )
 
-        base_url = f"{self.exchange_api}@{self.currency_date}/{self.api_version}"
-        self.logger.debug(f"Setting currency date to {self.currency_date}")
-        self.logger.debug(f"Base url for currency API: {base_url}")
+        base_url = f"{self.exchange_api}@{currency_date}/{self.api_version}"
+        self.logger.debug("Setting currency date to %s", currency_date)
+        self.logger.debug("Base url for currency API: %s", base_url)
+        if len(self._base_urls) >= BASE_URLS_MAXSIZE:
+            self._base_urls.clear()
+        self._base_urls[key] = base_url
         return base_url
 
-    async def _get(self, endpoint: str, params=None) -> dict:
+    def _mirror_urls(self, currency_date: str, endpoint: str) -> list:
+        """
+        :return: list: URLs of endpoint at exchange_api and every fallback API. Fallback API is either
+                 a package URL which gets '@{date}' suffix or a template with '{date}' placeholder.
+        """
+        urls = [f"{self._build_base_url(currency_date)}{endpoint}"]
+        for api in self.fallback_apis:
+            base_url = api.format(date=currency_date) if '{date}' in api else f"{api}@{currency_date}"
+            urls.append(f"{base_url}/{self.api_version}{endpoint}")
+        return urls
+
+    def _cache_key(self, endpoint: str, currency_date: str = None) -> tuple:
+        return self.exchange_api, currency_date or self.currency_date, self.api_version, endpoint
+
+    def _cache_ttl(self, currency_date: str = None):
+        """
+        Tables for particular date never change, only 'latest' tables should expire.
+        Refreshed 'latest' tables are kept until they are older than max_staleness.
+        """
+        if (currency_date or self.currency_date) != 'latest':
+            return None
+        return self.max_staleness if self._refresher is not None else self.latest_ttl
+
+    async def _get(self, endpoint: str, params=None, currency_date: str = None) -> dict:
         """
         Make a GET request to the API.
 
         Args:
             endpoint (str): API endpoint to call.
             params (dict, optional): Query parameters.
+            currency_date (str, optional): date of rates, currency_date of the client by default.
         Returns:
-            dict: The JSON response.
+            dict: The JSON response, cached tables are shared by all callers and must not be modified.
+        """
+        if params is None:
+            cached = self.cache.get(self._cache_key(endpoint, currency_date))
+            if self.metrics is not None:
+                self.metrics.cache(hit=cached is not None)
+            if cached is not None:
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("Cache hit for %s at %s", endpoint, currency_date or self.currency_date)
+                return cached
+        return await self._request(endpoint, params, currency_date)
+
+    async def _request(self, endpoint: str, params=None, currency_date: str = None) -> dict:
+        """
+        Get endpoint bypassing in-memory cache. Concurrent requests of the same table are coalesced
+        into one in-flight request, including sync callers from many threads served by the background loop.
+        """
+        currency_date = currency_date or self.currency_date
+        if params is not None:
+            return await self._load(endpoint, params, currency_date)
+        return await self._inflight.do(
+            self._cache_key(endpoint, currency_date), lambda: self._load(endpoint, params, currency_date)
+        )
+
+    async def _load(self, endpoint: str, params, currency_date: str) -> dict:
+        """
+        Dated tables are looked up in rate_store first, then fetched from the API.
+        The result is stored in the cache and rate_store.
+        """
+        if self.metrics is None:
+            urls = self._mirror_urls(currency_date, endpoint)
+        else:
+            with self.metrics.time('url'):
+                urls = self._mirror_urls(currency_date, endpoint)
+        key = self._cache_key(endpoint, currency_date)
+        use_store = self.rate_store is not None and params is None and currency_date != 'latest'
+        data = await asyncio.to_thread(self.rate_store.get, key) if use_store else None
+        if data is not None:
+            self.logger.debug("Rate store hit for %s at %s", endpoint, currency_date)
+        else:
+            data = await self._fetch(urls, endpoint, params)
+            if use_store:
+                await asyncio.to_thread(self.rate_store.set, key, data)
+        if params is None:
+            self.cache.set(key, data, ttl=self._cache_ttl(currency_date))
+            if self._refresher is not None and currency_date == 'latest':
+                self._refresher.track(endpoint)
+        return data
+
+    async def _fetch(self, urls: list, endpoint: str, params=None) -> dict:
+        """
+        Fetch endpoint with retries, every retry goes to the next mirror after jittered exponential backoff.
+
+        Args:
+            urls (list): URLs of the endpoint at every mirror, the first one is primary.
+            endpoint (str): API endpoint to call.
+            params (dict, optional): Query parameters.
+        Raises:
+            CurrencyNotSupportedError: endpoint doesn't exist, it's not retried.
+            ExchangeApiError: all attempts failed.
         """
-        url = f"{self._get_base_url}{endpoint}"
-        self.logger.debug(f"Fetching currency data from currency API {url}")
-        async with aiohttp.ClientSession(headers=self.headers) as session:
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(backoff_delay(attempt - 1, self.backoff_base, self.backoff_max))
+            url = urls[attempt % len(urls)]
+            hedge_url = urls[(attempt + 1) % len(urls)] if self.hedge and len(urls) > 1 else None
+            self.logger.debug("Fetching currency data from currency API %s, attempt %s", url, attempt + 1)
             try:
-                async with session.get(url, params=params) as response:
-                    response.raise_for_status()
-                    return await response.json()
-            except (HTTPError, ClientResponseError) as err:
-                raise SystemExit(f"{endpoint} not supported", err)
+                return await self._fetch_hedged(url, hedge_url, params, endpoint)
+            except CurrencyNotSupportedError as err:
+                raise CurrencyNotSupportedError(f"{endpoint} not supported", url=err.url, status=err.status) from err
+            except ExchangeApiError as err:
+                self.logger.warning("Request to currency API failed: %s", err)
+                error = err
+        raise error
+
+    async def _fetch_once(self, url: str, params=None, endpoint: str = None) -> dict:
+        started = time.perf_counter()
+        data = await self.transport.get_json(url, params=params, timeout=self.request_timeout, endpoint=endpoint)
+        self._latencies.add(time.perf_counter() - started)
+        return data
+
+    async def _fetch_hedged(self, url: str, hedge_url: Optional[str], params=None, endpoint: str = None) -> dict:
+        """
+        Fetch url, if hedge_url is given and url doesn't respond within hedge_percentile of recent latencies,
+        fire the same request to hedge_url and return whichever succeeds first.
+        """
+        if hedge_url is None:
+            return await self._fetch_once(url, params, endpoint)
+        primary = asyncio.ensure_future(self._fetch_once(url, params, endpoint))
+        hedge_delay = self._latencies.percentile(self.hedge_percentile, default=self.request_timeout / 4)
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            return primary.result()
+        self.logger.debug("No response from %s within %.3fs, sending hedged request to %s", url, hedge_delay, hedge_url)
+        pending = {primary, asyncio.ensure_future(self._fetch_once(hedge_url, params, endpoint))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
 
     async def _post(self, endpoint, payload=None):
         """API doesn't support POST requests. Raising NotImplementedError in case of"""
         raise NotImplementedError(f"POST method is not supported for {self._get_base_url}")
 
-    def get(self, endpoint: str, params=None) -> dict:
-        return asyncio.run(self._get(endpoint, params))
+    def _get_background_loop(self) -> BackgroundLoop:
+        if self._background_loop is None:
+            with self._background_loop_lock:
+                if self._background_loop is None:
+                    background_loop = BackgroundLoop()
+                    weakref.finalize(self, background_loop.stop, self.transport.aclose)
+                    self._background_loop = background_loop
+        return self._background_loop
+
+    def _dispatch(self, callback: Callable, *args):
+        """
+        Call user callback. Callbacks called by the background loop of sync API run in its dispatcher thread
+        instead, so they can call sync API of the client back without blocking the loop.
+        """
+        background_loop = self._background_loop
+        if background_loop is not None and background_loop.in_loop_thread():
+            background_loop.call_soon(callback, *args)
+        else:
+            callback(*args)
+
+    def _run(self, coro):
+        """
+        Run coroutine on the client's background event loop, so sync calls share one connection pool.
+        """
+        return self._get_background_loop().run(coro)
+
+    def _submit(self, coro):
+        """
+        Schedule coroutine on the client's background event loop without waiting for it.
+        :return: concurrent.futures.Future
+        """
+        return self._get_background_loop().submit(coro)
+
+    def get(self, endpoint: str, params=None, currency_date: str = None) -> dict:
+        """
+        :param currency_date: date of rates, currency_date of the client by default
+        :return: dict: rate table, cached tables are shared by all callers and must not be modified
+        """
+        if params is None:
+            cached = self.cache.get(self._cache_key(endpoint, currency_date))
+            if self.metrics is not None:
+                self.metrics.cache(hit=cached is not None)
+            if cached is not None:
+                return cached
+        return self._run(self._request(endpoint, params, currency_date))
+
+    def cache_info(self):
+        """
+        :return: CacheInfo: hits, misses, maxsize and current size of the rate tables cache
+        """
+        return self.cache.cache_info()
+
+    def cache_clear(self):
+        self.cache.clear()
 
     def post(self, endpoint: str) -> dict:
-        return asyncio.run(self._post(endpoint))
+        return self._run(self._post(endpoint))
+
+    async def aclose(self):
+        """Stop background refresh and close HTTP session of the client when used from your own event loop"""
+        if self._refresher is not None:
+            await self._refresher.stop()
+        await self.transport.aclose()
+
+    def close(self):
+        """Close HTTP session and stop background event loop used by sync API"""
+        with self._background_loop_lock:
+            background_loop, self._background_loop = self._background_loop, None
+        if background_loop is not None:
+            background_loop.stop(self.aclose)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
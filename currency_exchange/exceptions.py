@@ -37,3 +37,20 @@ class CurrencyTypeError(TypeError):
         self.invalid_type = invalid_type
         self.message = f"{message}. Got: {invalid_type}"
         super().__init__(self.message)
+
+
+class ExchangeApiError(Exception):
+    """Exception raised when rates can't be fetched from Exchange API."""
+
+    def __init__(self, message, url=None, status=None):
+        self.url = url
+        self.status = status
+        self.message = message
+        super().__init__(self.message)
+
+
+class CurrencyNotSupportedError(ExchangeApiError, KeyError):
+    """Exception raised when Exchange API doesn't have requested endpoint, e.g. rate table of unknown currency."""
+
+    def __str__(self):
+        return self.message
@@ -0,0 +1,162 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Latency histogram with fixed upper bounds in seconds, the last bucket counts values above all bounds.
+    """
+
+    def __init__(self, bounds: tuple = BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self) -> dict:
+        """
+        :return: dict: upper bound => number of values less than or equal to it, '+Inf' => total count
+        """
+        result, total = {}, 0
+        for bound, count in zip(self.bounds + ('+Inf',), self.counts):
+            total += count
+            result[bound] = total
+        return result
+
+
+class Metrics:
+    """
+    Thread-safe in-memory collector of client metrics:
+
+    - latency histograms of request stages: 'url' (URL build and date validation), 'connect' (connection
+      acquisition until response headers), 'transfer' (body download), 'decode' (JSON parsing) and 'lookup'
+      (rate selection from fetched table or snapshot);
+    - number of HTTP requests by endpoint and status ('error' for connection errors and timeouts);
+    - bytes of downloaded response bodies after decompression, 304 Not Modified responses have no body;
+    - cache hits and misses.
+
+    Read collected values with snapshot() or export them with to_prometheus(). Every recorded value is also
+    passed to callback(name, value, labels), e.g. to forward it to StatsD or OpenTelemetry.
+
+        metrics = Metrics()
+        currency_client = CurrencyConverter(metrics=metrics)
+    """
+
+    def __init__(self, callback: Optional[Callable[[str, float, dict], None]] = None, buckets: tuple = BUCKETS):
+        self.callback = callback
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.requests = {}
+            self.bytes_downloaded = 0
+            self.cache_hits = 0
+            self.cache_misses = 0
+
+    def observe(self, stage: str, seconds: float):
+        """Record duration of request stage in seconds"""
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        if self.callback is not None:
+            self.callback('stage_seconds', seconds, {'stage': stage})
+
+    @contextmanager
+    def time(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def request(self, endpoint: str, status, size: int = 0):
+        """
+        Record finished HTTP request.
+        :param status: HTTP status code or 'error'
+        :param size: size of downloaded response body in bytes
+        """
+        with self._lock:
+            key = (endpoint, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.bytes_downloaded += size
+        if self.callback is not None:
+            self.callback('requests', 1, {'endpoint': endpoint, 'status': str(status)})
+            if size:
+                self.callback('bytes_downloaded', size, {'endpoint': endpoint})
+
+    def cache(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        if self.callback is not None:
+            self.callback('cache_hits' if hit else 'cache_misses', 1, {})
+
+    def snapshot(self) -> dict:
+        """
+        :return: dict: copy of collected values, stages are reported as
+                 {'count': ..., 'sum': ..., 'buckets': {upper bound: cumulative count}}
+        """
+        with self._lock:
+            requests = {}
+            for (endpoint, status), count in self.requests.items():
+                requests.setdefault(endpoint, {})[status] = count
+            return {
+                'stages': {
+                    stage: {'count': histogram.count, 'sum': histogram.sum, 'buckets': histogram.cumulative()}
+                    for stage, histogram in self.stages.items()
+                },
+                'requests': requests,
+                'bytes_downloaded': self.bytes_downloaded,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+            }
+
+    def to_prometheus(self, prefix: str = 'pyxrate') -> str:
+        """
+        :return: str: collected values in Prometheus text exposition format
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duration of request stages in seconds.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for stage, histogram in sorted(snapshot['stages'].items()):
+            for bound, count in histogram['buckets'].items():
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+        lines += [
+            f"# HELP {prefix}_requests_total HTTP requests to Exchange API by endpoint and status.",
+            f"# TYPE {prefix}_requests_total counter",
+        ]
+        for endpoint, statuses in sorted(snapshot['requests'].items()):
+            for status, count in sorted(statuses.items()):
+                lines.append(f'{prefix}_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+        for name, help_text in (
+            ('bytes_downloaded', "Bytes of decompressed response bodies downloaded from Exchange API."),
+            ('cache_hits', "Rate tables served from in-memory cache."),
+            ('cache_misses', "Rate tables not found in in-memory cache."),
+        ):
+            lines += [
+                f"# HELP {prefix}_{name}_total {help_text}",
+                f"# TYPE {prefix}_{name}_total counter",
+                f"{prefix}_{name}_total {snapshot[name]}",
+            ]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,169 @@
+import csv
+import json
+import math
+import time
+from itertools import islice
+from typing import Callable, IO, Iterable, Iterator, Optional
+
+from currency_exchange.exceptions import CurrencyNotSupportedError, CustomDateMismatchException
+
+FORMATS = ('csv', 'jsonl')
+# errors of rate tables which won't change on retry, e.g. unknown currency or invalid date
+PERMANENT_ERRORS = (CurrencyNotSupportedError, CustomDateMismatchException, ValueError)
+
+
+def detect_format(path: str, default: str = 'csv') -> str:
+    """
+    :return: str: 'jsonl' for .jsonl/.ndjson files, 'csv' for .csv files, default otherwise
+    """
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if path.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def read_rows(file: IO[str], file_format: str = 'csv') -> Iterator[dict]:
+    """
+    Lazily read rows of CSV (with header) or JSON Lines file.
+    """
+    if file_format == 'csv':
+        yield from csv.DictReader(file)
+    elif file_format == 'jsonl':
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Invalid file format: {file_format}. Must be one of: {', '.join(FORMATS)}")
+
+
+class RowWriter:
+    """
+    Incrementally write rows to CSV or JSON Lines file, CSV header is taken from the first row.
+    NaN results of failed rows are written as null to JSON Lines.
+    """
+
+    def __init__(self, file: IO[str], file_format: str = 'csv'):
+        if file_format not in FORMATS:
+            raise ValueError(f"Invalid file format: {file_format}. Must be one of: {', '.join(FORMATS)}")
+        self.file = file
+        self.file_format = file_format
+        self._csv_writer = None
+
+    def write(self, row: dict):
+        if self.file_format == 'jsonl':
+            # NaN of failed rows isn't valid JSON, it's written as null
+            row = {
+                key: None if isinstance(value, float) and not math.isfinite(value) else value
+                for key, value in row.items()
+            }
+            self.file.write(json.dumps(row, separators=(',', ':'), allow_nan=False) + '\n')
+            return
+        if self._csv_writer is None:
+            self._csv_writer = csv.DictWriter(self.file, fieldnames=list(row), extrasaction='ignore')
+            self._csv_writer.writeheader()
+        self._csv_writer.writerow(row)
+
+
+def _parse_amount(value):
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def convert_stream(
+    converter,
+    rows: Iterable[dict],
+    currency_to_get: str,
+    amount_field: str = 'amount',
+    currency_field: str = 'currency',
+    date_field: Optional[str] = 'date',
+    output_field: Optional[str] = None,
+    chunk_size: int = 10_000,
+    max_concurrency: int = 8,
+    errors: str = 'nan',
+    prefetch: bool = True,
+    progress: Optional[Callable[[int, float], None]] = None,
+) -> Iterator[dict]:
+    """
+    Convert stream of rows in chunks with bounded memory, every chunk is grouped by (date, base currency),
+    so each rate table is fetched once, and rate tables of the next chunk are prefetched while the current
+    one is converted. Tables which failed to prefetch with a permanent error (unknown currency, invalid date) are
+    remembered, rows of them fail without new requests for the rest of the stream. Tables which failed with
+    transient errors (HTTP 5xx, timeouts) are requested again by the next chunks.
+
+    :param converter: CurrencyConverter instance
+    :param rows: dicts with amount, currency and optionally date fields, e.g. from read_rows()
+    :param currency_to_get: target currency code
+    :param date_field: field with date of rates, empty value or missing field means converter's currency_date
+    :param output_field: field for converted amount, '{amount_field}_{currency_to_get}' by default
+    :param errors: 'raise' - raise first error, 'skip' - drop failed rows, 'nan' - write NaN for failed rows
+    :param progress: callback called after every chunk with total number of rows and elapsed seconds
+    :return: generator of input rows extended with output_field
+    """
+    currency_to_get = currency_to_get.lower()
+    output_field = output_field or f"{amount_field}_{currency_to_get}"
+    policy = 'nan' if errors == 'skip' else errors
+    rows = iter(rows)
+    started = time.perf_counter()
+    processed = 0
+    # table key => permanent error of its prefetch, failed tables aren't cached and would be requested by every chunk
+    failed = {}
+    prefetched = None
+
+    chunk = list(islice(rows, chunk_size))
+    while chunk:
+        if prefetched is not None and converter.shared_store is None:
+            # rates of shared store are resolved without tables, so only tables of plain converter are remembered
+            failed.update(
+                (key, table) for key, table in prefetched.result().items() if isinstance(table, PERMANENT_ERRORS)
+            )
+        next_chunk = list(islice(rows, chunk_size))
+        prefetched = None
+        if prefetch and next_chunk and converter.snapshot is None:
+            keys = _table_keys(converter, next_chunk, currency_field, date_field) - failed.keys()
+            prefetched = converter._submit(converter._fetch_tables(keys, max_concurrency))
+
+        row_errors = [None] * len(chunk)
+        if failed:
+            row_errors = [failed.get(_table_key(converter, row, currency_field, date_field)) for row in chunk]
+        if policy == 'raise':
+            for error in row_errors:
+                if error is not None:
+                    raise error
+        requests = [
+            (
+                _parse_amount(row.get(amount_field)),
+                row.get(currency_field) or '',
+                currency_to_get,
+                row.get(date_field) or None,
+            )
+            for row, error in zip(chunk, row_errors)
+            if error is None
+        ]
+        results = iter(converter.convert_many(requests, errors=policy, max_concurrency=max_concurrency))
+        for row, error in zip(chunk, row_errors):
+            result = next(results) if error is None else math.nan
+            if errors == 'skip' and math.isnan(result):
+                continue
+            row[output_field] = result
+            yield row
+
+        processed += len(chunk)
+        if progress is not None:
+            progress(processed, time.perf_counter() - started)
+        chunk = next_chunk
+
+
+def _table_key(converter, row: dict, currency_field: str, date_field: Optional[str]) -> tuple:
+    return (
+        converter._date_str(row.get(date_field) or None),
+        converter.pivot_currency or (row.get(currency_field) or '').lower(),
+    )
+
+
+def _table_keys(converter, rows: list, currency_field: str, date_field: Optional[str]) -> set:
+    return {_table_key(converter, row, currency_field, date_field) for row in rows}
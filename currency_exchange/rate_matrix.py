@@ -0,0 +1,83 @@
+from array import array
+from typing import Iterable, Sequence
+
+from currency_exchange.arrays import import_numpy
+
+
+class RateMatrix:
+    """
+    Rates of all currencies against one pivot currency stored in a compact float64 array.
+
+    Currency codes are interned to integer indices, so cross rate of any pair A => B is derived
+    as rates[B] / rates[A] with plain array indexing and without fetching rate table of A.
+    """
+
+    def __init__(self, pivot: str, codes: Iterable[str], rates: Iterable[float], date: str = None):
+        self.pivot = pivot
+        self.date = date
+        self.codes = list(codes)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.rates = array('d', rates)
+
+    @classmethod
+    def from_table(cls, rate_data: dict, pivot: str) -> 'RateMatrix':
+        """
+        :param rate_data: rate table of pivot currency as returned by Exchange API, e.g /currencies/usd.json
+        :param pivot: pivot currency code
+        """
+        rates = dict(rate_data[pivot])
+        rates[pivot] = 1.0
+        return cls(pivot, rates.keys(), rates.values(), date=rate_data.get('date'))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, currency_code: str) -> bool:
+        return currency_code in self.index
+
+    def code_index(self, currency_code: str) -> int:
+        try:
+            return self.index[currency_code]
+        except KeyError:
+            raise KeyError(f"{currency_code} is not a valid currency code or currency code is not supported")
+
+    def indices(self, currency_codes: Iterable[str]):
+        """
+        :return: integer indices of currency codes, numpy array if numpy is installed
+        """
+        np = import_numpy()
+        result = [self.code_index(code) for code in currency_codes]
+        return np.asarray(result, dtype=np.intp) if np is not None else array('q', result)
+
+    def rate(self, currency_to_exchange: str, currency_to_get: str) -> float:
+        base_rate = self.rates[self.code_index(currency_to_exchange)]
+        quote_rate = self.rates[self.code_index(currency_to_get)]
+        return quote_rate / base_rate if base_rate else float('nan')
+
+    def cross_rates(self, currencies_to_exchange: Sequence, currencies_to_get: Sequence):
+        """
+        Vectorized cross rates lookup for whole arrays of pairs.
+
+        :param currencies_to_exchange: currency codes or integer indices (see indices())
+        :param currencies_to_get: currency codes or integer indices, same length as currencies_to_exchange
+        :return: float64 rates, numpy array if numpy is installed, otherwise array('d')
+        """
+        if len(currencies_to_exchange) != len(currencies_to_get):
+            raise ValueError("currencies_to_exchange and currencies_to_get must have the same length")
+        base_idx = self._as_indices(currencies_to_exchange)
+        quote_idx = self._as_indices(currencies_to_get)
+        np = import_numpy()
+        if np is not None:
+            rates = np.frombuffer(self.rates, dtype=np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = rates[quote_idx] / rates[base_idx]
+            result[rates[base_idx] == 0] = np.nan
+            return result
+        rates = self.rates
+        return array('d', (rates[q] / rates[b] if rates[b] else float('nan') for b, q in zip(base_idx, quote_idx)))
+
+    def _as_indices(self, currencies: Sequence):
+        if len(currencies) and isinstance(currencies[0], str):
+            return self.indices(currencies)
+        np = import_numpy()
+        return np.asarray(currencies, dtype=np.intp) if np is not None else currencies
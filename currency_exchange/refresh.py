@@ -0,0 +1,88 @@
+import asyncio
+import inspect
+import logging
+import weakref
+from typing import Awaitable, Callable, Optional
+
+
+class LatestRefresher:
+    """
+    Periodically refreshes 'latest' rate tables which were requested at least once, so readers are
+    served from memory and never wait on the network after warm-up.
+
+    Bound methods are held by weak reference, so the refresher doesn't keep its client alive and stops once
+    the client is garbage collected.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[str], Awaitable],
+        interval: float,
+        on_error: Optional[Callable[[str, BaseException], None]] = None,
+        logger: Optional[logging.Logger] = None,
+        dispatch: Optional[Callable] = None,
+    ):
+        """
+        :param refresh: coroutine function which fetches endpoint bypassing cache and stores the result
+        :param interval: seconds between refreshes
+        :param on_error: callback called with endpoint and exception when refresh fails
+        :param dispatch: function which calls on_error with given arguments, direct call by default
+        """
+        self._refresh_ref = _weak_callable(refresh)
+        self._dispatch_ref = _weak_callable(dispatch)
+        self.interval = interval
+        self.on_error = on_error
+        self.logger = logger or logging.getLogger(__name__)
+        self.endpoints = set()
+        self._task = None
+
+    def track(self, endpoint: str):
+        """
+        Add endpoint to refresh and start refresh task in the running event loop if it isn't started yet.
+        """
+        self.endpoints.add(endpoint)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _refresh(self, endpoint: str):
+        refresh = self._refresh_ref()
+        if refresh is None:
+            return
+        try:
+            await refresh(endpoint)
+        except Exception as err:
+            self.logger.warning("Failed to refresh %s: %s", endpoint, err)
+            if self.on_error is not None:
+                dispatch = self._dispatch_ref()
+                if dispatch is not None:
+                    dispatch(self.on_error, endpoint, err)
+                else:
+                    self.on_error(endpoint, err)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self._refresh_ref() is None:
+                self.logger.debug("Owner of refresh is garbage collected, stopping refresh")
+                return
+            endpoints = list(self.endpoints)
+            self.logger.debug("Refreshing %s latest rate tables", len(endpoints))
+            await asyncio.gather(*(self._refresh(endpoint) for endpoint in endpoints))
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+def _weak_callable(func: Optional[Callable]) -> Callable[[], Optional[Callable]]:
+    """
+    :return: function which returns func, or None once the object of bound method func is garbage collected
+    """
+    if inspect.ismethod(func):
+        return weakref.WeakMethod(func)
+    return lambda: func
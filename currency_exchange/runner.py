@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Coroutine
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoop:
+    """
+    Event loop running forever in a daemon thread.
+
+    Sync API submits coroutines to this loop instead of creating a new event loop per call,
+    so connections and other loop-bound resources are reused between calls and threads.
+    """
+
+    def __init__(self, name: str = "currency-exchange-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_forever, name=name, daemon=True)
+        self._thread.start()
+        self._callbacks = None
+        self._callbacks_lock = threading.Lock()
+
+    def _run_forever(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Coroutine, timeout: float = None) -> Any:
+        """
+        Run coroutine in the background loop and wait for its result in the calling thread.
+        """
+        if self.loop.is_closed():
+            coro.close()
+            raise RuntimeError("Background event loop is closed")
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError(
+                "Sync API of the client is called from its background event loop thread, it would wait for itself "
+                "forever. Call it from another thread or use AsyncCurrencyConverter inside the event loop"
+            )
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    def submit(self, coro: Coroutine):
+        """
+        Schedule coroutine in the background loop without waiting for the result.
+        :return: concurrent.futures.Future
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def call_soon(self, callback: Callable, *args):
+        """
+        Run user callback in the dispatcher thread of the loop instead of the loop thread, so the callback
+        can call sync API of the client. Callbacks run one by one in the order they are scheduled.
+        """
+        if self._callbacks is None:
+            with self._callbacks_lock:
+                if self._callbacks is None:
+                    self._callbacks = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix=f"{self._thread.name}-callbacks"
+                    )
+        self._callbacks.submit(_run_callback, callback, *args)
+
+    def stop(self, *closers):
+        """
+        Run cleanup coroutine factories (e.g. transport.aclose) and stop the loop thread.
+        """
+        if self.loop.is_closed():
+            return
+        for closer in closers:
+            try:
+                self.run(closer(), timeout=5)
+            except Exception:
+                pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._callbacks is not None:
+            self._callbacks.shutdown(wait=False)
+        if self.in_loop_thread():
+            return
+        self._thread.join(timeout=5)
+        if self._thread.is_alive():
+            logger.warning("Background event loop thread %s didn't stop in 5 seconds, leaving it", self._thread.name)
+            return
+        self.loop.close()
+
+
+def _run_callback(callback: Callable, *args):
+    try:
+        callback(*args)
+    except Exception:
+        logger.exception("Callback %r failed", callback)
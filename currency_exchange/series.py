@@ -0,0 +1,69 @@
+from array import array
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+from currency_exchange.arrays import import_numpy
+
+
+@dataclass
+class RateSeries:
+    """
+    Columnar historical rates: dates plus one float64 array of rates per quote currency.
+    Missing rates (e.g. table isn't published for a date) are NaN.
+    """
+
+    base: str
+    dates: list = field(default_factory=list)
+    rates: dict = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, currency_to_get: str):
+        return self.rates[currency_to_get.lower()]
+
+
+def to_date(value) -> date:
+    """
+    :param value: date, datetime or string in 'YEAR-MONTH-DAY' format
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Incorrect date format {value}, allowed format: 'YEAR-MONTH-DAY'. e.g '2024-11-20'")
+
+
+def date_range(start, end=None, step=1, minimal_date: date = None) -> list:
+    """
+    :param start: first date of the range
+    :param end: last date of the range (inclusive), today by default
+    :param step: days between dates, int or timedelta
+    :param minimal_date: start is clamped to this date
+    :return: list: dates in 'YEAR-MONTH-DAY' format
+    """
+    start = to_date(start)
+    end = date.today() if end is None else to_date(end)
+    step = step if isinstance(step, timedelta) else timedelta(days=step)
+    if step <= timedelta(0):
+        raise ValueError(f"step must be positive. Got: {step}")
+    if minimal_date is not None and start < minimal_date:
+        start = minimal_date
+    dates = []
+    while start <= end:
+        dates.append(start.isoformat())
+        start += step
+    return dates
+
+
+def float64_array(values: Iterable[float]):
+    """
+    :return: numpy float64 array if numpy is installed, otherwise array('d')
+    """
+    np = import_numpy()
+    result = array('d', values)
+    return np.frombuffer(result, dtype=np.float64) if np is not None else result
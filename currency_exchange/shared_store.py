@@ -0,0 +1,364 @@
+import asyncio
+import json
+import math
+import os
+import struct
+import threading
+import time
+from array import array
+from multiprocessing import shared_memory
+from typing import Callable, Iterable, Optional
+
+MAGIC = b'PYXRSHM1'
+HEADER = struct.Struct('<8sQIII')
+SEQUENCE = struct.Struct('<Q')
+SEQUENCE_OFFSET = 8
+METADATA_LENGTH = struct.Struct('<I')
+ALIGNMENT = 8
+READ_RETRIES = 100
+ATTACH_INTERVAL = 1.0
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to existing segment without registering it in resource tracker of this process,
+    otherwise the segment would be unlinked when the first worker exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == 'posix':
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class SharedRateStore:
+    """
+    Rate tables in shared memory, published by one leader process and read by all worker processes of the host
+    (e.g. pre-fork gunicorn workers) without their own copies of rate tables and without their own requests.
+
+    Layout: header (magic, sequence, capacities), length-prefixed JSON metadata with currency codes and
+    (date, base currency) of every table, and float64 block of shape (tables_capacity, codes_capacity).
+    Readers don't take locks: the leader makes sequence odd while it writes and even when it's done (seqlock),
+    readers retry if sequence was odd or changed during the read.
+
+        # leader, e.g. gunicorn master process
+        store = SharedRateStore.create('pyxrate')
+        SharedRatePublisher(CurrencyConverter(), store, currencies=['usd', 'eur'], interval=60).start()
+
+        # workers
+        currency_client = CurrencyConverter(shared_store=SharedRateStore('pyxrate'))
+
+    Workers attach lazily, until the leader has created the segment and published the table converter fetches
+    rates as usual. Content published more than max_age seconds ago is ignored as well, so workers fall back to
+    fetching when the leader or its publisher is gone.
+    """
+
+    def __init__(self, name: str, max_age: Optional[float] = 3600.0):
+        """
+        :param max_age: max age of published content in seconds, None to serve it regardless of age
+        """
+        self.name = name
+        self.max_age = max_age
+        self.owner = False
+        self._shm = None
+        self._rates = None
+        self._codes_capacity = 0
+        self._next_attach = 0.0
+        self._metadata_sequence = None
+        self._published_at = 0.0
+        self._codes = self._tables = self._dates = None
+
+    @classmethod
+    def create(
+        cls,
+        name: str,
+        codes_capacity: int = 512,
+        tables_capacity: int = 64,
+        metadata_capacity: int = 64 * 1024,
+        max_age: Optional[float] = 3600.0,
+    ) -> 'SharedRateStore':
+        """
+        Create the segment in the leader process, the segment left by previous leader with the same layout is reused.
+
+        :param codes_capacity: max number of currency codes
+        :param tables_capacity: max number of (date, base currency) tables
+        :param metadata_capacity: max size of JSON metadata in bytes
+        :param max_age: see SharedRateStore
+        """
+        metadata_capacity += -(HEADER.size + metadata_capacity) % ALIGNMENT
+        size = HEADER.size + metadata_capacity + tables_capacity * codes_capacity * 8
+        store = cls(name, max_age)
+        store.owner = True
+        try:
+            store._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            HEADER.pack_into(store._shm.buf, 0, MAGIC, 0, codes_capacity, tables_capacity, metadata_capacity)
+            METADATA_LENGTH.pack_into(store._shm.buf, HEADER.size, 0)
+        except FileExistsError:
+            shm = _attach(name)
+            if HEADER.unpack_from(shm.buf)[2:] != (codes_capacity, tables_capacity, metadata_capacity):
+                shm.close()
+                raise ValueError(f"Shared memory {name} exists with different layout, unlink it first")
+            store._shm = shm
+            (sequence,) = SEQUENCE.unpack_from(shm.buf, SEQUENCE_OFFSET)
+            if sequence & 1:
+                # previous leader crashed in the middle of publish, its content may be torn: empty the store
+                # and make sequence even again, otherwise readers would wait for the end of publish forever
+                METADATA_LENGTH.pack_into(shm.buf, HEADER.size, 0)
+                SEQUENCE.pack_into(shm.buf, SEQUENCE_OFFSET, sequence + 1)
+        store._map_rates()
+        return store
+
+    def _map_rates(self):
+        _, _, self._codes_capacity, _, metadata_capacity = HEADER.unpack_from(self._shm.buf)
+        start = HEADER.size + metadata_capacity
+        self._rates = self._shm.buf[start:].cast('d')
+
+    def _attached(self) -> bool:
+        if self._shm is not None:
+            return True
+        if time.monotonic() < self._next_attach:
+            return False
+        try:
+            shm = _attach(self.name)
+        except FileNotFoundError:
+            self._next_attach = time.monotonic() + ATTACH_INTERVAL
+            return False
+        if bytes(shm.buf[:8]) != MAGIC:
+            shm.close()
+            raise ValueError(f"Shared memory {self.name} is not a currency rates store")
+        self._shm = shm
+        self._map_rates()
+        return True
+
+    @property
+    def version(self) -> int:
+        """:return: int: number of publications, 0 if nothing is published or the store is absent"""
+        if not self._attached():
+            return 0
+        return SEQUENCE.unpack_from(self._shm.buf, SEQUENCE_OFFSET)[0] // 2
+
+    def publish(self, tables: dict) -> int:
+        """
+        Replace content of the store, must be called by one process only (the leader).
+
+        :param tables: (date, base currency) => rate table as returned by Exchange API, date is 'latest'
+                       or date in 'YEAR-MONTH-DAY' format as requested
+        :return: int: new version of the store
+        """
+        if not self._attached():
+            raise FileNotFoundError(f"Shared memory {self.name} doesn't exist, create it with SharedRateStore.create")
+        buf = self._shm.buf
+        _, sequence, codes_capacity, tables_capacity, metadata_capacity = HEADER.unpack_from(buf)
+        keys = list(tables)
+        codes = {code for (_, base), rate_data in tables.items() for code in rate_data[base]}
+        codes = sorted(codes.union(base for _, base in keys))
+        metadata = json.dumps(
+            {
+                'codes': codes,
+                'tables': [[date, base, tables[(date, base)].get('date')] for date, base in keys],
+                'published_at': time.time(),
+            },
+            separators=(',', ':'),
+        ).encode()
+        if len(codes) > codes_capacity or len(keys) > tables_capacity:
+            raise ValueError(
+                f"{len(keys)} tables of {len(codes)} currencies don't fit into the store: "
+                f"capacity is {tables_capacity} tables of {codes_capacity} currencies"
+            )
+        if METADATA_LENGTH.size + len(metadata) > metadata_capacity:
+            raise ValueError(f"Metadata of {len(metadata)} bytes exceeds metadata_capacity {metadata_capacity}")
+
+        index = {code: i for i, code in enumerate(codes)}
+        rows = array('d', [math.nan]) * (len(keys) * codes_capacity)
+        for row, (date, base) in enumerate(keys):
+            offset = row * codes_capacity
+            for code, rate in tables[(date, base)][base].items():
+                rows[offset + index[code]] = rate
+            rows[offset + index[base]] = 1.0
+
+        # sequence is odd while content is written, even if it was left odd by a crashed publish
+        writing = sequence | 1
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, writing)
+        METADATA_LENGTH.pack_into(buf, HEADER.size, len(metadata))
+        offset = HEADER.size + METADATA_LENGTH.size
+        end = offset + len(metadata)
+        buf[offset:end] = metadata
+        self._rates[: len(rows)] = rows
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, writing + 1)
+        return (writing + 1) // 2
+
+    def _load_metadata(self, sequence: int):
+        buf = self._shm.buf
+        (length,) = METADATA_LENGTH.unpack_from(buf, HEADER.size)
+        offset = HEADER.size + METADATA_LENGTH.size
+        end = offset + length
+        metadata = json.loads(bytes(buf[offset:end])) if length else {'codes': [], 'tables': []}
+        self._codes = {code: i for i, code in enumerate(metadata['codes'])}
+        self._tables = {(date, base): row for row, (date, base, _) in enumerate(metadata['tables'])}
+        self._published_at = metadata.get('published_at', 0.0)
+        self._dates = {}
+        for row, (date, _, table_date) in enumerate(metadata['tables']):
+            self._dates.setdefault(date, (row, table_date))
+        self._metadata_sequence = sequence
+
+    def _read(self, read: Callable):
+        """Run read() between two equal even values of sequence, so it never sees partially written content"""
+        buf = self._shm.buf
+        for _ in range(READ_RETRIES):
+            (sequence,) = SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)
+            if sequence & 1:
+                time.sleep(0)
+                continue
+            try:
+                if sequence != self._metadata_sequence:
+                    self._load_metadata(sequence)
+                result = read()
+            except (ValueError, KeyError, IndexError, struct.error):
+                # torn metadata, content is being replaced
+                result = None
+            if SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0] == sequence:
+                return result
+            self._metadata_sequence = None
+        return None
+
+    def _rate_at(self, row: int, currency_code: str) -> float:
+        return self._rates[row * self._codes_capacity + self._codes[currency_code]]
+
+    def rate(self, currency_to_exchange: str, currency_to_get: str, date: str = 'latest') -> Optional[float]:
+        """
+        :param date: 'latest' or date in 'YEAR-MONTH-DAY' format as published
+        :return: float: rate from the table of currency_to_exchange or cross rate via another table of the same date,
+                 None if the store is absent, its content is older than max_age or doesn't have the rate
+        """
+        if not self._attached():
+            return None
+
+        def read():
+            if self.max_age is not None and time.time() - self._published_at > self.max_age:
+                return None
+            if currency_to_exchange not in self._codes or currency_to_get not in self._codes:
+                return None
+            row = self._tables.get((date, currency_to_exchange))
+            if row is not None:
+                rate = self._rate_at(row, currency_to_get)
+            elif date in self._dates:
+                row = self._dates[date][0]
+                base_rate = self._rate_at(row, currency_to_exchange)
+                rate = self._rate_at(row, currency_to_get) / base_rate if base_rate else math.nan
+            else:
+                return None
+            return None if math.isnan(rate) else rate
+
+        return self._read(read)
+
+    def tables(self) -> list:
+        """:return: list: published (date, base currency) tables"""
+        if not self._attached():
+            return []
+        return self._read(lambda: list(self._tables)) or []
+
+    def close(self):
+        """Detach from the segment, the segment stays available to other processes"""
+        if self._shm is not None:
+            self._rates.release()
+            self._rates = None
+            self._shm.close()
+            self._shm = None
+            self._metadata_sequence = None
+
+    def unlink(self):
+        """Remove the segment, called by the leader on shutdown"""
+        if self._attached():
+            self._shm.unlink()
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __del__(self):
+        # the view of rates must be released before SharedMemory closes its mmap
+        self.close()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.owner:
+            self.unlink()
+        else:
+            self.close()
+
+
+class SharedRatePublisher:
+    """
+    Leader side of SharedRateStore: fetches rate tables with the converter and publishes them into the store
+    every interval seconds in a background thread. Unchanged 'latest' tables are revalidated with
+    conditional requests, so a refresh is mostly header-only exchange.
+    """
+
+    def __init__(
+        self,
+        converter,
+        store: SharedRateStore,
+        currencies: Iterable[str],
+        dates: Iterable = ('latest',),
+        interval: float = 60.0,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        self.converter = converter
+        self.store = store
+        self.currencies = [code.lower() for code in currencies]
+        self.dates = [converter._date_str(date) for date in dates]
+        self.interval = interval
+        self.on_error = on_error
+        self._stopped = threading.Event()
+        self._thread = None
+
+    async def _fetch(self) -> dict:
+        keys = [(date, base) for date in self.dates for base in self.currencies]
+        endpoint = self.converter.currencies_endpoint
+        tables = await asyncio.gather(
+            *(self.converter._request(f"{endpoint}{base}.json", currency_date=date) for date, base in keys),
+            return_exceptions=True,
+        )
+        return dict(zip(keys, tables))
+
+    def publish(self) -> int:
+        """
+        Fetch tables bypassing in-memory cache and publish available ones.
+        :return: int: number of published tables
+        """
+        tables = self.converter._run(self._fetch())
+        failed = {key: table for key, table in tables.items() if isinstance(table, BaseException)}
+        if failed:
+            self.converter.logger.warning("Failed to fetch %s of %s shared rate tables", len(failed), len(tables))
+            if self.on_error is not None:
+                for error in failed.values():
+                    self.on_error(error)
+        tables = {key: table for key, table in tables.items() if key not in failed}
+        if tables:
+            self.store.publish(tables)
+        return len(tables)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.publish()
+            except Exception as err:
+                self.converter.logger.warning("Failed to publish shared rate tables: %s", err)
+                if self.on_error is not None:
+                    self.on_error(err)
+            self._stopped.wait(self.interval)
+
+    def start(self) -> 'SharedRatePublisher':
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='pyxrate-shared-publisher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,40 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one in-flight call.
+    All callers await the same task and receive its result or exception.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable]) -> Any:
+        """
+        :param key: call key, e.g. (exchange_api, currency_date, api_version, endpoint)
+        :param factory: coroutine function which is called only if there is no in-flight call with the same key
+        """
+        # tasks are bound to event loop, so calls from different loops are never coalesced
+        key = (asyncio.get_running_loop(), key)
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda done_task: self._done(key, done_task))
+        else:
+            self.coalesced += 1
+        # shield keeps the shared call running when one of the callers is cancelled
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # mark exception as retrieved in case all callers were cancelled
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
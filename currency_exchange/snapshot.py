@@ -0,0 +1,130 @@
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Optional
+
+MAGIC = b'PYXRSNP1'
+HEADER = struct.Struct('<8sI')
+ALIGNMENT = 8
+
+
+def write_snapshot(path: str, tables: dict):
+    """
+    Write rate tables into a snapshot file.
+
+    File layout: header (magic, metadata length), JSON metadata with currency index, dates and base currencies,
+    padding to 8 bytes and dense little-endian float64 block of shape (dates, bases, currencies).
+    Missing tables or rates are stored as NaN.
+
+    :param path: snapshot file path, the file is replaced atomically
+    :param tables: (date, base currency) => rate table as returned by Exchange API
+    """
+    dates = sorted({date for date, _ in tables})
+    bases = sorted({base for _, base in tables})
+    codes = sorted({code for (_, base), rate_data in tables.items() for code in rate_data[base]} | set(bases))
+    index = {code: i for i, code in enumerate(codes)}
+
+    rates = array('d', [math.nan]) * (len(dates) * len(bases) * len(codes))
+    for d, date in enumerate(dates):
+        for b, base in enumerate(bases):
+            rate_data = tables.get((date, base))
+            if rate_data is None:
+                continue
+            row = (d * len(bases) + b) * len(codes)
+            for code, rate in rate_data[base].items():
+                rates[row + index[code]] = rate
+            rates[row + index[base]] = 1.0
+    if sys.byteorder != 'little':
+        rates.byteswap()
+
+    metadata = json.dumps({'codes': codes, 'dates': dates, 'bases': bases}, separators=(',', ':')).encode()
+    padding = -(HEADER.size + len(metadata)) % ALIGNMENT
+    tmp_path = f"{os.fspath(path)}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as snapshot_file:
+        snapshot_file.write(HEADER.pack(MAGIC, len(metadata)))
+        snapshot_file.write(metadata + b'\0' * padding)
+        rates.tofile(snapshot_file)
+    os.replace(tmp_path, path)
+
+
+class RateSnapshot:
+    """
+    Read-only memory-mapped snapshot of rate tables for O(1) lookups without network and JSON parsing.
+
+    Pages of the file are shared between all processes which open the same snapshot.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.fspath(path)
+        with open(self.path, 'rb') as snapshot_file:
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, metadata_length = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a currency rates snapshot")
+        if sys.byteorder != 'little':
+            self._mmap.close()
+            raise NotImplementedError("Memory-mapped snapshots are supported only on little-endian platforms")
+        start, offset = HEADER.size, HEADER.size + metadata_length
+        metadata = json.loads(self._mmap[start:offset])
+        offset += -offset % ALIGNMENT
+        self.codes = metadata['codes']
+        self.dates = metadata['dates']
+        self.bases = metadata['bases']
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.date_index = {date: i for i, date in enumerate(self.dates)}
+        self.base_index = {base: i for i, base in enumerate(self.bases)}
+        self._view = memoryview(self._mmap)[offset:]
+        self.rates = self._view.cast('d')
+
+    def _code_index(self, currency_code: str) -> int:
+        try:
+            return self.index[currency_code]
+        except KeyError:
+            raise KeyError(f"{currency_code} is not a valid currency code or currency code is not supported")
+
+    def _row(self, date: Optional[str], base: str) -> int:
+        if date is None or date == 'latest':
+            d = len(self.dates) - 1
+        else:
+            try:
+                d = self.date_index[date]
+            except KeyError:
+                raise KeyError(f"Rates for {date} are not available in snapshot {self.path}")
+        return (d * len(self.bases) + self.base_index[base]) * len(self.codes)
+
+    def rate(self, currency_to_exchange: str, currency_to_get: str, date: str = None) -> float:
+        """
+        :param date: date in 'YEAR-MONTH-DAY' format, the last date of the snapshot for None or 'latest'
+        :return: float: rate from the table of currency_to_exchange, or cross rate via the first base currency
+                 of the snapshot when currency_to_exchange table is not included. NaN if rate is missing.
+        """
+        quote = self._code_index(currency_to_get)
+        if currency_to_exchange in self.base_index:
+            return self.rates[self._row(date, currency_to_exchange) + quote]
+        row = self._row(date, self.bases[0])
+        base_rate = self.rates[row + self._code_index(currency_to_exchange)]
+        return self.rates[row + quote] / base_rate if base_rate else math.nan
+
+    def table(self, currency_to_exchange: str, date: str = None) -> dict:
+        """
+        :return: dict: rate table in Exchange API format, rates missing in the snapshot are skipped
+        """
+        row = self._row(date, currency_to_exchange)
+        rates = (self.rates[row + i] for i in range(len(self.codes)))
+        return {code: rate for code, rate in zip(self.codes, rates) if not math.isnan(rate)}
+
+    def close(self):
+        self.rates.release()
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,103 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Hashable, Optional
+
+
+class SQLiteRateStore:
+    """
+    Persistent on-disk store for dated rate tables, safe for concurrent access from many processes.
+
+    Tables are stored as zlib compressed JSON, the least recently used tables are evicted
+    when total size of stored tables exceeds max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, timeout: float = 30.0):
+        self.path = os.fspath(path)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS rate_tables (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS rate_tables_accessed_at ON rate_tables (accessed_at);
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """sqlite3 connections can't be shared between threads, so every thread opens its own one"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return '|'.join(map(str, key)) if isinstance(key, tuple) else str(key)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        :param key: store key, e.g. (exchange_api, currency_date, api_version, endpoint)
+        :return: stored table or None
+        """
+        connection = self._connect()
+        key = self._key(key)
+        row = connection.execute("SELECT body FROM rate_tables WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute("UPDATE rate_tables SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, key: Hashable, value: Any):
+        body = zlib.compress(json.dumps(value, separators=(',', ':')).encode())
+        connection = self._connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT OR REPLACE INTO rate_tables (key, body, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (self._key(key), body, len(body), time.time()),
+            )
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection):
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM rate_tables").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = connection.execute("SELECT key, size FROM rate_tables ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM rate_tables WHERE key = ?", evicted)
+
+    def __contains__(self, key: Hashable) -> bool:
+        row = self._connect().execute("SELECT 1 FROM rate_tables WHERE key = ?", (self._key(key),)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM rate_tables").fetchone()[0]
+
+    def size(self) -> int:
+        """:return: total size of stored tables in bytes"""
+        return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM rate_tables").fetchone()[0]
+
+    def clear(self):
+        self._connect().execute("DELETE FROM rate_tables")
+
+    def close(self):
+        """Close connection of the calling thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
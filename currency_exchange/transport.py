@@ -0,0 +1,372 @@
+import asyncio
+import functools
+import gzip
+import http.client
+import json
+import random
+import ssl
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from currency_exchange.exceptions import CurrencyNotSupportedError, ExchangeApiError
+from currency_exchange.metrics import Metrics
+
+if TYPE_CHECKING:  # aiohttp is imported on the first request of AiohttpTransport
+    import aiohttp
+
+HTTP_BACKENDS = ('aiohttp', 'stdlib')
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+@functools.lru_cache(maxsize=None)
+def _aiohttp_accept_encoding() -> str:
+    try:
+        from aiohttp.compression_utils import HAS_BROTLI
+    except ImportError:  # pragma: no cover
+        HAS_BROTLI = False
+    return 'gzip, deflate, br' if HAS_BROTLI else 'gzip, deflate'
+
+
+class BaseTransport:
+    """
+    ETag/Last-Modified of the last validators_maxsize responses are kept with their decoded bodies, so repeated
+    requests of the same URL are conditional and 304 Not Modified responses are served without body download.
+    """
+
+    def __init__(self, metrics: Optional[Metrics] = None, validators_maxsize: int = 256):
+        self.metrics = metrics
+        self.validators_maxsize = validators_maxsize
+        self._validators = OrderedDict()
+
+    def _validator(self, url: str) -> Optional[tuple]:
+        validator = self._validators.get(url)
+        if validator is not None:
+            self._validators.move_to_end(url)
+        return validator
+
+    @staticmethod
+    def _conditional_headers(validator: Optional[tuple]) -> Optional[dict]:
+        if validator is None:
+            return None
+        etag, last_modified, _ = validator
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def _store_validator(self, url: str, etag: Optional[str], last_modified: Optional[str], data: dict):
+        if self.validators_maxsize <= 0:
+            return
+        self._validators[url] = (etag, last_modified, data)
+        self._validators.move_to_end(url)
+        while len(self._validators) > self.validators_maxsize:
+            self._validators.popitem(last=False)
+
+
+class AiohttpTransport(BaseTransport):
+    """
+    HTTP transport with a single long-lived aiohttp session and connection pool.
+
+    aiohttp is imported and session is created lazily on the first request, the session is bound to the event loop
+    it was created in. Responses are compressed with gzip (or brotli when aiohttp can decode it).
+    """
+
+    def __init__(
+        self,
+        headers: dict = None,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30.0,
+        metrics: Optional[Metrics] = None,
+        validators_maxsize: int = 256,
+    ):
+        super().__init__(metrics, validators_maxsize)
+        self.headers = headers
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+        self._loop = None
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed:
+            if self._loop is not loop:
+                raise RuntimeError(
+                    "HTTP session is bound to another event loop, use separate client instance per event loop"
+                )
+            return self._session
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        headers = {'Accept-Encoding': _aiohttp_accept_encoding(), **(self.headers or {})}
+        self._session = aiohttp.ClientSession(headers=headers, connector=connector)
+        self._loop = loop
+        return self._session
+
+    async def get_json(self, url: str, params=None, timeout: Optional[float] = None, endpoint: str = None) -> dict:
+        """
+        :param endpoint: endpoint label of the request in metrics, url by default
+        :raises CurrencyNotSupportedError: endpoint doesn't exist (HTTP 404)
+        :raises ExchangeApiError: any other HTTP, connection or timeout error
+        """
+        import aiohttp
+
+        session = self._get_session()
+        metrics = self.metrics
+        validator = self._validator(url) if params is None else None
+        status, size = 'error', 0
+        started = time.perf_counter()
+        try:
+            async with session.get(
+                url,
+                params=params,
+                headers=self._conditional_headers(validator),
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                status = response.status
+                connected = time.perf_counter()
+                if metrics is not None:
+                    metrics.observe('connect', connected - started)
+                if response.status == 304 and validator is not None:
+                    return validator[2]
+                if response.status == 404:
+                    raise CurrencyNotSupportedError(f"{url} not supported", url=url, status=response.status)
+                response.raise_for_status()
+                body = await response.read()
+                etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+            transferred = time.perf_counter()
+            data = json.loads(body)
+            size = len(body)
+        except aiohttp.ClientResponseError as err:
+            raise ExchangeApiError(f"{url} request failed: {err.status} {err.message}", url, err.status) from err
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise ExchangeApiError(f"{url} request failed: {err!r}", url) from err
+        except ValueError as err:
+            raise ExchangeApiError(f"{url} returned invalid JSON: {err}", url, status) from err
+        finally:
+            if metrics is not None:
+                metrics.request(endpoint or url, status, size)
+        if metrics is not None:
+            metrics.observe('transfer', transferred - connected)
+            metrics.observe('decode', time.perf_counter() - transferred)
+        if params is None and (etag or last_modified):
+            self._store_validator(url, etag, last_modified, data)
+        return data
+
+    async def aclose(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+
+class StdlibTransport(BaseTransport):
+    """
+    Lightweight HTTP transport on http.client with keep-alive connections, for short-lived processes
+    (CLI jobs, serverless functions) where import of aiohttp and session setup would dominate the runtime.
+
+    Requests are blocking and run in a thread pool of up to limit threads, so coroutines of the client keep
+    running concurrently. Idle connections are kept per host for keepalive_timeout seconds and reused,
+    responses are compressed with gzip. Redirects are followed up to max_redirects times, like aiohttp does.
+    """
+
+    max_redirects = 10
+
+    def __init__(
+        self,
+        headers: dict = None,
+        limit: int = 100,
+        keepalive_timeout: float = 30.0,
+        metrics: Optional[Metrics] = None,
+        validators_maxsize: int = 256,
+    ):
+        super().__init__(metrics, validators_maxsize)
+        self.headers = {'Accept-Encoding': 'gzip, deflate', **(headers or {})}
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._ssl_context = None
+
+    def _connection(self, scheme: str, netloc: str, timeout: Optional[float]) -> tuple:
+        """
+        :return: tuple: (connection, True if it's a reused keep-alive connection)
+        """
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get((scheme, netloc), [])
+            while idle:
+                connection, idle_since = idle.pop()
+                if now - idle_since < self.keepalive_timeout:
+                    connection.timeout = timeout
+                    if connection.sock is not None:
+                        connection.sock.settimeout(timeout)
+                    return connection, True
+                connection.close()
+            if scheme == 'https' and self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=timeout, context=self._ssl_context), False
+        return http.client.HTTPConnection(netloc, timeout=timeout), False
+
+    def _release(self, scheme: str, netloc: str, connection: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), [])
+            if len(idle) < self.limit:
+                idle.append((connection, time.monotonic()))
+                return
+        connection.close()
+
+    def _send(self, scheme: str, netloc: str, path: str, headers: dict, timeout: Optional[float]) -> tuple:
+        """
+        Send GET request, a request on a reused connection closed by the server meanwhile is repeated once
+        on a new connection.
+
+        :return: tuple: (connection, response with read body, body)
+        """
+        while True:
+            connection, reused = self._connection(scheme, netloc, timeout)
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                return connection, response, response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if not reused:
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+
+    def request_json(self, url: str, params=None, timeout: Optional[float] = None, endpoint: str = None) -> dict:
+        """
+        Blocking request, see get_json.
+        """
+        metrics = self.metrics
+        split = urlsplit(url)
+        scheme, netloc, path = split.scheme, split.netloc, split.path or '/'
+        query = '&'.join(part for part in (split.query, urlencode(params) if params else '') if part)
+        if query:
+            path = f"{path}?{query}"
+        with self._lock:
+            validator = self._validator(url) if params is None else None
+        headers = {**self.headers, **(self._conditional_headers(validator) or {})}
+        status, size = 'error', 0
+        started = time.perf_counter()
+        try:
+            for _ in range(self.max_redirects + 1):
+                connection, response, body = self._send(scheme, netloc, path, headers, timeout)
+                status = response.status
+                if response.will_close:
+                    connection.close()
+                else:
+                    self._release(scheme, netloc, connection)
+                location = response.getheader('Location') if status in REDIRECT_STATUSES else None
+                if location is None:
+                    break
+                redirect = urlsplit(urljoin(f"{scheme}://{netloc}{path}", location))
+                if redirect.scheme not in ('http', 'https'):
+                    break
+                scheme, netloc, path = redirect.scheme, redirect.netloc, redirect.path or '/'
+                if redirect.query:
+                    path = f"{path}?{redirect.query}"
+            else:
+                raise ExchangeApiError(f"{url} request failed: more than {self.max_redirects} redirects", url, status)
+            transferred = time.perf_counter()
+            if response.status == 304 and validator is not None:
+                return validator[2]
+            if response.status == 404:
+                raise CurrencyNotSupportedError(f"{url} not supported", url=url, status=response.status)
+            if response.status >= 300:
+                raise ExchangeApiError(f"{url} request failed: {response.status} {response.reason}", url, status)
+            encoding = response.getheader('Content-Encoding', '').lower()
+            if encoding == 'gzip':
+                body = gzip.decompress(body)
+            elif encoding == 'deflate':
+                body = zlib.decompress(body)
+            data = json.loads(body)
+            size = len(body)
+        except (OSError, http.client.HTTPException) as err:
+            raise ExchangeApiError(f"{url} request failed: {err!r}", url) from err
+        except (ValueError, zlib.error) as err:
+            raise ExchangeApiError(f"{url} returned invalid JSON: {err}", url, status) from err
+        finally:
+            if metrics is not None:
+                metrics.request(endpoint or url, status, size)
+        if metrics is not None:
+            # http.client reads headers and body in one go, so both are reported as transfer
+            metrics.observe('transfer', transferred - started)
+            metrics.observe('decode', time.perf_counter() - transferred)
+        etag, last_modified = response.getheader('ETag'), response.getheader('Last-Modified')
+        if params is None and (etag or last_modified):
+            with self._lock:
+                self._store_validator(url, etag, last_modified, data)
+        return data
+
+    async def get_json(self, url: str, params=None, timeout: Optional[float] = None, endpoint: str = None) -> dict:
+        """
+        :param endpoint: endpoint label of the request in metrics, url by default
+        :raises CurrencyNotSupportedError: endpoint doesn't exist (HTTP 404)
+        :raises ExchangeApiError: any other HTTP, connection or timeout error
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.limit, thread_name_prefix='pyxrate-http')
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(self.request_json, url, params, timeout, endpoint)
+        )
+
+    async def aclose(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+            executor, self._executor = self._executor, None
+        for connection, _ in (item for connections in idle.values() for item in connections):
+            connection.close()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+class LatencyTracker:
+    """
+    Latencies of recent successful requests, used to choose delay before hedged request.
+    """
+
+    def __init__(self, size: int = 256, min_samples: int = 10):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, percentile: float, default: float) -> float:
+        """
+        :param percentile: value in 0..1 range, e.g 0.95
+        :param default: value returned until there are enough samples
+        """
+        if len(self.samples) < self.min_samples:
+            return default
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """
+    Exponential backoff with full jitter.
+    :param attempt: number of retry, starting from 0
+    """
+    return random.uniform(0, min(maximum, base * 2**attempt))
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+
+@dataclass(frozen=True)
+class RateChange:
+    currency_to_exchange: str
+    currency_to_get: str
+    old_rate: float
+    new_rate: float
+    date: Optional[str] = None
+
+    @property
+    def delta(self) -> float:
+        return self.new_rate - self.old_rate
+
+    @property
+    def relative_delta(self) -> float:
+        """:return: float: delta relative to the old rate, e.g. 0.01 is 1% move"""
+        return self.delta / self.old_rate if self.old_rate else float('inf')
+
+
+class RateSubscription:
+    """
+    Changes of watched pairs, delivered to the callback or consumed as async iterator of lists of RateChange:
+
+        async for changes in await currency_client.watch([('usd', 'eur')], interval=30):
+            ...
+
+    Rates of the first fetched table are the baseline, only later moves are reported.
+    """
+
+    def __init__(
+        self,
+        watcher: 'RateWatcher',
+        pairs: list,
+        interval: float,
+        threshold: float,
+        callback: Optional[Callable[[list], None]],
+    ):
+        self.pairs = pairs
+        self.interval = interval
+        self.threshold = threshold
+        self.callback = callback
+        self.closed = False
+        self._watcher = watcher
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue() if callback is None else None
+        self._rates = {}
+
+    def _baseline(self, rate_data: dict, endpoint: str):
+        for currency_to_exchange, currency_to_get, pair_endpoint, _ in self.pairs:
+            if pair_endpoint == endpoint and (currency_to_exchange, currency_to_get) not in self._rates:
+                rate = self._watcher.rate(rate_data, currency_to_exchange, currency_to_get)
+                if rate is not None:
+                    self._rates[(currency_to_exchange, currency_to_get)] = rate
+
+    def _moved(self, old_rate: float, new_rate: float) -> bool:
+        if self.threshold:
+            return abs(new_rate - old_rate) >= self.threshold * abs(old_rate)
+        return new_rate != old_rate
+
+    def _update(self, rate_data: dict, endpoint: str, changed: set) -> list:
+        """
+        :param changed: currency codes with changed rates in the table of endpoint
+        :return: list: RateChange of pairs which moved above threshold since the last reported rate
+        """
+        changes = []
+        for currency_to_exchange, currency_to_get, pair_endpoint, _ in self.pairs:
+            if pair_endpoint != endpoint or (currency_to_exchange not in changed and currency_to_get not in changed):
+                continue
+            key = (currency_to_exchange, currency_to_get)
+            rate = self._watcher.rate(rate_data, currency_to_exchange, currency_to_get)
+            if rate is None:
+                continue
+            old_rate = self._rates.get(key)
+            if old_rate is None:
+                self._rates[key] = rate
+            elif self._moved(old_rate, rate):
+                self._rates[key] = rate
+                changes.append(RateChange(currency_to_exchange, currency_to_get, old_rate, rate, rate_data.get('date')))
+        return changes
+
+    def _emit(self, changes: list):
+        if self._queue is not None:
+            self._queue.put_nowait(changes)
+            return
+        try:
+            if self._watcher.dispatch is not None:
+                self._watcher.dispatch(self.callback, changes)
+            else:
+                self.callback(changes)
+        except Exception:
+            self._watcher.logger.exception("Rate watch callback failed")
+
+    def close(self):
+        """Stop delivering changes, pollers without other subscriptions are stopped. Can be called from any thread."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._watcher.unsubscribe(self)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._watcher.unsubscribe, self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> list:
+        if self._queue is None:
+            raise TypeError("Subscription with callback can't be iterated")
+        if self.closed and self._queue.empty():
+            raise StopAsyncIteration
+        changes = await self._queue.get()
+        if changes is None:
+            raise StopAsyncIteration
+        return changes
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _Poller:
+    def __init__(self, base: str):
+        self.base = base
+        self.subscriptions = []
+        self.rate_data = None
+        self.task = None
+
+
+class RateWatcher:
+    """
+    One poller per watched 'latest' rate table shared by all subscriptions of the converter.
+    Every poll diffs the new table against the previous one once and notifies subscriptions whose pairs changed,
+    unchanged table (e.g. 304 Not Modified returns the same object) costs nothing.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable],
+        select: Callable[[dict, str, str], float],
+        logger: Optional[logging.Logger] = None,
+        dispatch: Optional[Callable] = None,
+    ):
+        """
+        :param fetch: coroutine function which fetches endpoint bypassing cache
+        :param select: function which selects rate of the pair from rate table
+        :param dispatch: function which calls subscription callback with given arguments, direct call by default
+        """
+        self.fetch = fetch
+        self.select = select
+        self.dispatch = dispatch
+        self.logger = logger or logging.getLogger(__name__)
+        self._pollers = {}
+
+    def rate(self, rate_data: dict, currency_to_exchange: str, currency_to_get: str) -> Optional[float]:
+        try:
+            return self.select(rate_data, currency_to_exchange, currency_to_get)
+        except KeyError:
+            return None
+
+    def subscribe(
+        self, pairs: list, interval: float, threshold: float = 0.0, callback: Optional[Callable] = None
+    ) -> RateSubscription:
+        """
+        Must be called in the event loop of pollers.
+
+        :param pairs: (currency_to_exchange, currency_to_get, endpoint, base currency of endpoint table) tuples
+        """
+        subscription = RateSubscription(self, pairs, interval, threshold, callback)
+        for endpoint, base in {(endpoint, base) for _, _, endpoint, base in pairs}:
+            poller = self._pollers.get(endpoint)
+            if poller is None:
+                poller = self._pollers[endpoint] = _Poller(base)
+            poller.subscriptions.append(subscription)
+            if poller.rate_data is not None:
+                subscription._baseline(poller.rate_data, endpoint)
+            if poller.task is None or poller.task.done():
+                poller.task = asyncio.get_running_loop().create_task(self._poll(endpoint, poller))
+        return subscription
+
+    def unsubscribe(self, subscription: RateSubscription):
+        for endpoint, poller in list(self._pollers.items()):
+            if subscription in poller.subscriptions:
+                poller.subscriptions.remove(subscription)
+                if not poller.subscriptions:
+                    del self._pollers[endpoint]
+                    if poller.task is not None:
+                        poller.task.cancel()
+        if subscription._queue is not None:
+            subscription._queue.put_nowait(None)
+
+    def _changed(self, old_data: Optional[dict], new_data: dict, base: str) -> set:
+        """:return: set: currency codes with different rates in two tables of base currency"""
+        if new_data is old_data:
+            return set()
+        old_rates = old_data.get(base, {}) if old_data is not None else {}
+        return {code for code, rate in new_data.get(base, {}).items() if old_rates.get(code) != rate}
+
+    async def _poll(self, endpoint: str, poller: _Poller):
+        while True:
+            try:
+                rate_data = await self.fetch(endpoint)
+            except Exception as err:
+                self.logger.warning("Failed to poll %s: %s", endpoint, err)
+            else:
+                changed = self._changed(poller.rate_data, rate_data, poller.base)
+                previous, poller.rate_data = poller.rate_data, rate_data
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("Polled %s: %s changed rates", endpoint, len(changed))
+                for subscription in list(poller.subscriptions):
+                    if previous is None:
+                        subscription._baseline(rate_data, endpoint)
+                    elif changed:
+                        changes = subscription._update(rate_data, endpoint, changed)
+                        if changes:
+                            subscription._emit(changes)
+            if not poller.subscriptions:
+                return
+            await asyncio.sleep(min(subscription.interval for subscription in poller.subscriptions))
+
+    async def stop(self):
+        """Close all subscriptions and stop pollers"""
+        tasks = [poller.task for poller in self._pollers.values() if poller.task is not None]
+        for subscription in {s for poller in self._pollers.values() for s in poller.subscriptions}:
+            subscription.closed = True
+            self.unsubscribe(subscription)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,13 +1,42 @@
+import asyncio
+import gc
+import hashlib
+import inspect
+import itertools
+import json
+import math
+import re
+import os
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
-from unittest.mock import patch
+import weakref
+from unittest.mock import AsyncMock, patch
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from currency_exchange.cache import RateCache
+from currency_exchange.currency_index import CurrencyIndex
 from currency_exchange.data import ExchangeApiClient
-from currency_exchange.converter import CurrencyConverter
+from currency_exchange.metrics import Metrics
+from currency_exchange.converter import AsyncCurrencyConverter, CurrencyConverter
+from currency_exchange import arrays, cli
+from currency_exchange.pipeline import convert_stream
+from currency_exchange.rate_matrix import RateMatrix
+from currency_exchange.shared_store import SEQUENCE, SEQUENCE_OFFSET, SharedRatePublisher, SharedRateStore
+from currency_exchange.watch import RateChange
+from currency_exchange.snapshot import RateSnapshot
+from currency_exchange.store import SQLiteRateStore
+from currency_exchange.transport import StdlibTransport
 from currency_exchange.exceptions import (
+    CurrencyNotSupportedError,
+    ExchangeApiError,
     CustomDateMismatchException,
     CurrencyAmountValueError,
     CurrencyTypeError,
 )
-from datetime import datetime
+from datetime import date, datetime
 
 
 class TestCurrencyConverter(unittest.TestCase):
@@ -31,7 +60,21 @@ class TestCurrencyConverter(unittest.TestCase):
         with self.assertRaises(KeyError):
             self.converter.get_exchange_rate("foo", "eur")
 
-        mock_get.assert_called_once_with("/currencies/foo.json")
+        mock_get.assert_called_once_with("/currencies/foo.json", currency_date="latest")
+
+    @patch.object(ExchangeApiClient, "get")
+    def test_get_exchange_rate_invalid_currency_validated_locally(self, mock_get):
+        """Test that with validate_currencies invalid code is rejected without rate table request."""
+        self.converter.validate_currencies = True
+        mock_get.return_value = {"usd": "US Dollar", "eur": "Euro"}
+
+        with self.assertRaises(KeyError):
+            self.converter.get_exchange_rate("foo", "eur")
+        with self.assertRaises(KeyError):
+            self.converter.get_exchange_rate("usd", "bar")
+
+        mock_get.assert_called_with("/currencies.json", currency_date="latest")
+        self.assertEqual(mock_get.call_count, 2)
 
     @patch.object(ExchangeApiClient, "get")
     def test_get_exchange_rate_logging(self, mock_get):
@@ -51,6 +94,22 @@ class TestCurrencyConverter(unittest.TestCase):
             self.assertIn("Currency to retrieve: EUR", log.output[1])
             self.assertIn("Exchange rate from USD to EUR: 0.92", log.output[-1])
 
+    @patch.object(ExchangeApiClient, "get")
+    def test_get_exchange_rate_lazy_logging(self, mock_get):
+        """Test that debug messages are not formatted when DEBUG level is disabled."""
+
+        class Rates(dict):
+            formatted = 0
+
+            def __repr__(self):
+                Rates.formatted += 1
+                return super().__repr__()
+
+        mock_get.return_value = {"usd": Rates(eur=0.92), "date": "2024-11-29"}
+        self.converter.log_level = "WARNING"
+        self.assertEqual(self.converter.get_exchange_rate("usd", "eur"), 0.92)
+        self.assertEqual(Rates.formatted, 0)
+
     @patch.object(ExchangeApiClient, "get")
     def test_get_exchange_rate_invalid_currency_operational_date_to_exchange(self, mock_get):
         self.converter.currency_date = "2023-11-20"
@@ -64,7 +123,7 @@ class TestCurrencyConverter(unittest.TestCase):
         with self.assertRaises(CustomDateMismatchException):
             self.converter.get_exchange_rate("foo", "eur")
 
-        mock_get.assert_called_once_with("/currencies/foo.json")
+        mock_get.assert_called_once_with("/currencies/foo.json", currency_date="2023-11-20")
 
     @patch.object(CurrencyConverter, "get_exchange_rate")
     def test_convert_valid(self, mock_get_exchange_rate):
@@ -77,7 +136,7 @@ class TestCurrencyConverter(unittest.TestCase):
 
         # Assertions
         self.assertEqual(result, 92.00)  # 100 * 0.92 = 92.00
-        mock_get_exchange_rate.assert_called_once_with("usd", "eur")
+        mock_get_exchange_rate.assert_called_once_with("usd", "eur", date=None)
 
     @patch.object(CurrencyConverter, "get_exchange_rate")
     def test_convert_invalid_amount(self, mock_get_exchange_rate):
@@ -122,6 +181,13 @@ class TestCurrencyConverter(unittest.TestCase):
         )
         self.assertIn("Got: -100", str(cm.exception))
 
+    def test_convert_metadata(self):
+        """Test that validated methods keep name and signature of the wrapped method."""
+        for converter_class in (CurrencyConverter, AsyncCurrencyConverter):
+            self.assertEqual(converter_class.convert.__name__, "convert")
+            self.assertIn("currency_amount", inspect.signature(converter_class.convert).parameters)
+        self.assertTrue(inspect.iscoroutinefunction(AsyncCurrencyConverter.convert))
+
 
 class TestExchangeApiClientInvalidData(unittest.TestCase):
     is_class_name_print = False
@@ -159,6 +225,14 @@ class TestExchangeApiClientInvalidData(unittest.TestCase):
         with self.assertRaises(CustomDateMismatchException):
             _ = self.api_client._get_base_url
 
+    def test_base_url_memoized(self):
+        """Test that date is validated once per date value."""
+        self.api_client.currency_date = "2024-11-20"
+        with patch.object(ExchangeApiClient, "check_date") as mock_check_date:
+            base_url = self.api_client._get_base_url
+            self.assertIs(self.api_client._get_base_url, base_url)
+        mock_check_date.assert_called_once_with(datetime(2024, 11, 20))
+
     def test_base_url_with_invalid_format(self):
         """Test _get_base_url with an invalid date format."""
         self.api_client.currency_date = "invalid-date-format"
@@ -166,6 +240,18 @@ class TestExchangeApiClientInvalidData(unittest.TestCase):
             _ = self.api_client._get_base_url
         self.assertIn("Incorrect data format for currency_date", str(cm.exception))
 
+    def test_positional_arguments(self):
+        """Test that original fields keep their positions, options added later are keyword-only."""
+        currency_client = CurrencyConverter("https://example.com/api", "2024-11-20", "v1", {}, "/currencies/")
+        self.assertEqual(currency_client.currency_date, "2024-11-20")
+        self.assertEqual(currency_client.currencies_endpoint, "/currencies/")
+        with self.assertRaises(TypeError):
+            ExchangeApiClient("https://example.com/api", "2024-11-20", "v1", {}, ["https://mirror"])
+
+    def test_negative_max_retries(self):
+        with self.assertRaises(ValueError):
+            ExchangeApiClient(max_retries=-1)
+
 
 class TestCustomDateMismatchException(unittest.TestCase):
     is_class_name_print = False
@@ -245,5 +331,1105 @@ class TestCurrencyAmountValueError(unittest.TestCase):
         self.assertEqual(exception.amount, amount)
 
 
+RATES = {
+    "usd": {"usd": 1, "eur": 0.92, "gbp": 0.81, "uah": 41.2},
+    "eur": {"eur": 1, "usd": 1.087, "gbp": 0.88, "uah": 44.78},
+}
+REQUESTS_KEY = web.AppKey("requests", list)
+BEHAVIOUR_KEY = web.AppKey("behaviour", dict)
+
+
+def make_exchange_api_app():
+    """
+    Local stand-in for Exchange API serving /currencies.json and /currencies/{base}.json for mirrors
+    /{mirror}@{date}/v1 and /{mirror}/{date}/v1. app[BEHAVIOUR_KEY][mirror] may set "status", "delay" and
+    "redirect" (name of the mirror to redirect to).
+    Rate tables are gzip compressed and have ETag, matching If-None-Match is answered with 304.
+    """
+
+    async def handler(request):
+        request.app[REQUESTS_KEY].append(request.path)
+        mirror, date, endpoint = re.match(r"^/(\w+)[@/]([^/]+)/v1(/.*)$", request.path).groups()
+        behaviour = request.app[BEHAVIOUR_KEY].get(mirror, {})
+        await asyncio.sleep(behaviour.get("delay", 0))
+        if "status" in behaviour:
+            return web.Response(status=behaviour["status"])
+        if "redirect" in behaviour:
+            raise web.HTTPFound(request.path_qs.replace(f"/{mirror}", f"/{behaviour['redirect']}", 1))
+        date = "2024-11-29" if date == "latest" else date
+        if endpoint == "/currencies.json":
+            return web.json_response({"usd": "US Dollar", "eur": "Euro", "gbp": "British Pound", "uah": "Hryvnia"})
+        base = endpoint.removeprefix("/currencies/").removesuffix(".json")
+        if base not in RATES:
+            raise web.HTTPNotFound()
+        body = json.dumps({"date": date, base: RATES[base]})
+        etag = f'"{hashlib.sha1(body.encode()).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        response = web.Response(text=body, content_type="application/json", headers={"ETag": etag})
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            response.enable_compression(web.ContentCoding.gzip)
+        return response
+
+    app = web.Application()
+    app[REQUESTS_KEY] = []
+    app[BEHAVIOUR_KEY] = {}
+    app.router.add_get("/{tail:.*}", handler)
+    return app
+
+
+class ExchangeApiTestCase(unittest.IsolatedAsyncioTestCase):
+    """
+    Runs local stand-in Exchange API (see make_exchange_api_app) for every test. Subclasses which return options
+    from client_options() also get AsyncCurrencyConverter of it as self.currency_client.
+    """
+
+    def client_options(self):
+        """:return: keyword arguments of AsyncCurrencyConverter besides exchange_api, None for no client"""
+        return None
+
+    async def asyncSetUp(self):
+        self.app = make_exchange_api_app()
+        self.server = TestServer(self.app)
+        await self.server.start_server()
+        self.exchange_api = str(self.server.make_url("/api"))
+        options = self.client_options()
+        self.currency_client = None
+        if options is not None:
+            self.currency_client = AsyncCurrencyConverter(exchange_api=self.exchange_api, **options)
+        print(f"Test: {self.id()}")
+
+    async def asyncTearDown(self):
+        if self.currency_client is not None:
+            await self.currency_client.aclose()
+        await self.server.close()
+
+
+class TestRateCache(unittest.TestCase):
+    is_class_name_print = False
+
+    def setUp(self):
+        if not TestRateCache.is_class_name_print:
+            print(f"Running TestCase: {self.__class__.__name__}")
+            TestRateCache.is_class_name_print = True
+        self.cache = RateCache(maxsize=2)
+        print(f"Test: {self.id()}")
+
+    def test_lru_eviction(self):
+        """Test that least recently used entry is evicted when cache is full."""
+        self.cache.set("usd", 1)
+        self.cache.set("eur", 2)
+        self.cache.get("usd")
+        self.cache.set("uah", 3)
+        self.assertEqual(self.cache.get("usd"), 1)
+        self.assertIsNone(self.cache.get("eur"))
+        self.assertEqual(self.cache.get("uah"), 3)
+
+    def test_ttl_expiration(self):
+        """Test that entries stored with ttl expire and entries without ttl don't."""
+        with patch("currency_exchange.cache.time.monotonic", return_value=100.0):
+            self.cache.set("latest", 1, ttl=10)
+            self.cache.set("dated", 2)
+        with patch("currency_exchange.cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(self.cache.get("latest"))
+            self.assertEqual(self.cache.get("dated"), 2)
+
+    def test_cache_info(self):
+        """Test hit and miss counters."""
+        self.cache.set("usd", 1)
+        self.cache.get("usd")
+        self.cache.get("eur")
+        info = self.cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.maxsize, info.currsize), (1, 1, 2, 1))
+
+
+class TestExchangeApiClientCache(unittest.TestCase):
+    is_class_name_print = False
+
+    def setUp(self):
+        if not TestExchangeApiClientCache.is_class_name_print:
+            print(f"Running TestCase: {self.__class__.__name__}")
+            TestExchangeApiClientCache.is_class_name_print = True
+        self.api_client = ExchangeApiClient()
+        print(f"Test: {self.id()}")
+
+    @patch.object(ExchangeApiClient, "_fetch", new_callable=AsyncMock)
+    def test_get_uses_cache(self, mock_fetch):
+        """Test that the same table is downloaded only once."""
+        mock_fetch.return_value = {"usd": {"eur": 0.92}, "date": "2024-11-29"}
+        self.api_client.get("/currencies/usd.json")
+        self.api_client.get("/currencies/usd.json")
+        mock_fetch.assert_awaited_once()
+        self.assertEqual(self.api_client.cache_info().hits, 1)
+
+    @patch.object(ExchangeApiClient, "_fetch", new_callable=AsyncMock)
+    def test_cache_key_contains_date(self, mock_fetch):
+        """Test that tables for different dates are cached separately."""
+        mock_fetch.return_value = {"usd": {"eur": 0.92}, "date": "2024-11-20"}
+        self.api_client.get("/currencies/usd.json")
+        self.api_client.currency_date = "2024-11-20"
+        self.api_client.get("/currencies/usd.json")
+        self.assertEqual(mock_fetch.await_count, 2)
+
+    @patch.object(ExchangeApiClient, "_fetch", new_callable=AsyncMock)
+    def test_cache_disabled(self, mock_fetch):
+        """Test that cache_maxsize=0 disables caching."""
+        mock_fetch.return_value = {"usd": {"eur": 0.92}, "date": "2024-11-29"}
+        api_client = ExchangeApiClient(cache_maxsize=0)
+        api_client.get("/currencies/usd.json")
+        api_client.get("/currencies/usd.json")
+        self.assertEqual(mock_fetch.await_count, 2)
+
+    @patch.object(ExchangeApiClient, "_fetch", new_callable=AsyncMock)
+    def test_currencies_returns_copy(self, mock_fetch):
+        """Test that changes of currencies() result don't leak into the cached table."""
+        mock_fetch.return_value = {"usd": "US Dollar", "eur": "Euro"}
+        currency_client = CurrencyConverter()
+        try:
+            currency_client.currencies()["foo"] = "Foo"
+            self.assertEqual(currency_client.currencies(), {"usd": "US Dollar", "eur": "Euro"})
+            mock_fetch.assert_awaited_once()
+        finally:
+            currency_client.close()
+
+
+class TestAsyncCurrencyConverter(ExchangeApiTestCase):
+    async def test_convert(self):
+        """Test async conversion against local Exchange API."""
+        async with AsyncCurrencyConverter(exchange_api=self.exchange_api) as currency_client:
+            self.assertEqual(await currency_client.convert(100, "USD", "EUR"), 92.0)
+            self.assertEqual(await currency_client.currencies("uah"), "Hryvnia")
+
+    async def test_invalid_amount_raises_on_await(self):
+        """Test that invalid amount of async convert is raised when the coroutine is awaited."""
+        async with AsyncCurrencyConverter(exchange_api=self.exchange_api) as currency_client:
+            coro = currency_client.convert(-1, "usd", "eur")
+            self.assertTrue(inspect.iscoroutine(coro))
+            with self.assertRaises(CurrencyAmountValueError):
+                await coro
+
+    async def test_session_is_reused(self):
+        """Test that all calls go through one HTTP session."""
+        async with AsyncCurrencyConverter(exchange_api=self.exchange_api, cache_maxsize=0) as currency_client:
+            await currency_client.get_exchange_rate("usd", "eur")
+            session = currency_client.transport._session
+            await currency_client.get_exchange_rate("eur", "usd")
+            self.assertIs(currency_client.transport._session, session)
+        self.assertTrue(session.closed)
+
+    async def test_sync_converter_uses_background_loop(self):
+        """Test that sync API works from inside running event loop."""
+        currency_client = CurrencyConverter(exchange_api=self.exchange_api)
+        try:
+            self.assertEqual(await asyncio.to_thread(currency_client.get_exchange_rate, "usd", "uah"), 41.2)
+            self.assertEqual(await asyncio.to_thread(currency_client.convert, 10, "eur", "uah"), 447.8)
+        finally:
+            await asyncio.to_thread(currency_client.close)
+
+
+class TestBatchConversion(ExchangeApiTestCase):
+    def client_options(self):
+        return {}
+
+    async def test_convert_many_fetches_each_table_once(self):
+        """Test that batch is grouped by (date, base) and results keep input order."""
+        requests = [(100, "usd", "eur"), (10, "EUR", "uah"), (200, "usd", "gbp"), (1, "usd", "uah", "2024-11-20")]
+        result = await self.currency_client.convert_many(requests)
+        self.assertEqual(result, [92.0, 447.8, 162.0, 41.2])
+        self.assertEqual(len(self.app[REQUESTS_KEY]), 3)
+
+    async def test_get_exchange_rates_error_policies(self):
+        """Test raise / skip / nan error policies."""
+        pairs = [("usd", "eur"), ("foo", "eur"), ("usd", "bar")]
+        with self.assertRaises(KeyError):
+            await self.currency_client.get_exchange_rates(pairs[2:])
+        self.assertEqual(await self.currency_client.get_exchange_rates(pairs, errors="skip"), [0.92])
+        rates = await self.currency_client.get_exchange_rates(pairs, errors="nan")
+        self.assertEqual(rates[0], 0.92)
+        self.assertTrue(math.isnan(rates[1]) and math.isnan(rates[2]))
+
+    async def test_convert_many_invalid_amount(self):
+        """Test that invalid amount fails only its own item."""
+        result = await self.currency_client.convert_many([(-1, "usd", "eur"), (100, "usd", "eur")], errors="nan")
+        self.assertTrue(math.isnan(result[0]))
+        self.assertEqual(result[1], 92.0)
+        with self.assertRaises(ValueError):
+            await self.currency_client.convert_many([], errors="ignore")
+
+    async def test_invalid_items_fail_only_their_slot(self):
+        """Test that None or NaN code and wrong-length item fail only their own slot."""
+        requests = [(10, "usd", "eur"), (10, None, "eur"), (10, float("nan"), "eur"), (10, "usd")]
+        result = await self.currency_client.convert_many(requests, errors="nan")
+        self.assertEqual(result[0], 9.2)
+        self.assertTrue(all(math.isnan(amount) for amount in result[1:]))
+        self.assertEqual(await self.currency_client.convert_many(requests, errors="skip"), [9.2])
+        with self.assertRaises(TypeError):
+            await self.currency_client.convert_many(requests)
+        rates = await self.currency_client.get_exchange_rates([("usd", "eur"), (None, "eur")], errors="nan")
+        self.assertEqual(rates[0], 0.92)
+        self.assertTrue(math.isnan(rates[1]))
+
+
+class TestRateMatrix(unittest.TestCase):
+    is_class_name_print = False
+
+    def setUp(self):
+        if not TestRateMatrix.is_class_name_print:
+            print(f"Running TestCase: {self.__class__.__name__}")
+            TestRateMatrix.is_class_name_print = True
+        self.matrix = RateMatrix.from_table({"date": "2024-11-29", "usd": RATES["usd"]}, "usd")
+        print(f"Test: {self.id()}")
+
+    def test_cross_rate(self):
+        """Test that cross rate is derived from pivot table."""
+        self.assertAlmostEqual(self.matrix.rate("eur", "gbp"), 0.81 / 0.92)
+        self.assertEqual(self.matrix.rate("usd", "uah"), 41.2)
+        with self.assertRaises(KeyError):
+            self.matrix.rate("foo", "usd")
+
+    def test_cross_rates_vectorized(self):
+        """Test vectorized lookup by codes and by indices with and without numpy."""
+        expected = [0.81 / 0.92, 41.2 / 0.81]
+        for np_module in (arrays.import_numpy(), None):
+            with patch("currency_exchange.rate_matrix.import_numpy", lambda: np_module):
+                by_codes = self.matrix.cross_rates(["eur", "gbp"], ["gbp", "uah"])
+                by_indices = self.matrix.cross_rates(
+                    self.matrix.indices(["eur", "gbp"]), self.matrix.indices(["gbp", "uah"])
+                )
+                for result in (by_codes, by_indices):
+                    self.assertEqual(len(result), 2)
+                    for actual, rate in zip(result, expected):
+                        self.assertAlmostEqual(actual, rate)
+
+
+class TestPivotCurrencyConverter(ExchangeApiTestCase):
+    def client_options(self):
+        return {"pivot_currency": "USD"}
+
+    async def test_pivot_table_is_fetched_once(self):
+        """Test that all pairs are derived from one pivot table."""
+        self.assertAlmostEqual(await self.currency_client.get_exchange_rate("eur", "gbp"), 0.81 / 0.92)
+        rates = await self.currency_client.get_exchange_rates([("gbp", "uah"), ("eur", "usd")])
+        self.assertAlmostEqual(rates[0], 41.2 / 0.81)
+        self.assertAlmostEqual(rates[1], 1 / 0.92)
+        self.assertEqual(self.app[REQUESTS_KEY], ["/api@latest/v1/currencies/usd.json"])
+
+    async def test_rate_matrix_is_reused(self):
+        """Test that matrix is built once per cached table."""
+        matrix = await self.currency_client.rate_matrix()
+        self.assertIs(await self.currency_client.rate_matrix(), matrix)
+        self.assertEqual(matrix.pivot, "usd")
+
+
+class TestRateSeries(ExchangeApiTestCase):
+    def client_options(self):
+        return {}
+
+    async def test_rate_series(self):
+        """Test that series has one column per quote and start date is clamped to minimal supported date."""
+        series = await self.currency_client.get_rate_series("USD", ["eur", "foo"], "2024-02-28", "2024-03-05", step=2)
+        self.assertEqual(series.dates, ["2024-03-02", "2024-03-04"])
+        self.assertEqual(list(series["eur"]), [0.92, 0.92])
+        self.assertTrue(all(math.isnan(rate) for rate in series["foo"]))
+        self.assertEqual(len(self.app[REQUESTS_KEY]), 2)
+
+    async def test_rate_series_invalid_step(self):
+        with self.assertRaises(ValueError):
+            await self.currency_client.get_rate_series("usd", "eur", "2024-03-02", "2024-03-05", step=0)
+
+
+class TestSQLiteRateStore(unittest.TestCase):
+    is_class_name_print = False
+
+    def setUp(self):
+        if not TestSQLiteRateStore.is_class_name_print:
+            print(f"Running TestCase: {self.__class__.__name__}")
+            TestSQLiteRateStore.is_class_name_print = True
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "rates.sqlite")
+        print(f"Test: {self.id()}")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_store_is_shared_between_instances(self):
+        """Test that table saved by one store instance is visible for another one (e.g. other process)."""
+        store = SQLiteRateStore(self.path)
+        store.set(("api", "2024-11-20", "v1", "/currencies/usd.json"), {"usd": RATES["usd"]})
+        other_store = SQLiteRateStore(self.path)
+        self.assertEqual(other_store.get(("api", "2024-11-20", "v1", "/currencies/usd.json")), {"usd": RATES["usd"]})
+        self.assertIsNone(other_store.get(("api", "2024-11-21", "v1", "/currencies/usd.json")))
+        store.close()
+        other_store.close()
+
+    def test_eviction(self):
+        """Test that least recently used tables are evicted when max_bytes is exceeded."""
+        store = SQLiteRateStore(self.path, max_bytes=1)
+        store.set("usd", {"usd": RATES["usd"]})
+        store.set("eur", {"eur": RATES["eur"]})
+        self.assertEqual(len(store), 0)
+        store.max_bytes = 10_000
+        store.set("usd", {"usd": RATES["usd"]})
+        store.set("eur", {"eur": RATES["eur"]})
+        self.assertEqual(len(store), 2)
+        store.close()
+
+    @patch.object(ExchangeApiClient, "_fetch", new_callable=AsyncMock)
+    def test_warm_makes_new_client_network_free(self, mock_fetch):
+        """Test that dated tables are served from rate store by fresh converter."""
+        mock_fetch.return_value = {"usd": RATES["usd"], "date": "2024-11-20"}
+        with CurrencyConverter(rate_store=SQLiteRateStore(self.path)) as currency_client:
+            self.assertEqual(currency_client.warm(["2024-11-20"], ["usd"]), 1)
+        with CurrencyConverter(rate_store=SQLiteRateStore(self.path), currency_date="2024-11-20") as currency_client:
+            self.assertEqual(currency_client.get_exchange_rate("usd", "eur"), 0.92)
+        mock_fetch.assert_awaited_once()
+
+
+class TestRateSnapshot(ExchangeApiTestCase):
+    def client_options(self):
+        return {}
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "rates.snapshot")
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        self.tmp_dir.cleanup()
+
+    async def test_offline_conversion(self):
+        """Test that converter with snapshot doesn't use network."""
+        written = await self.currency_client.build_snapshot(self.path, ["2024-11-19", "2024-11-20"], ["usd", "foo"])
+        self.assertEqual(written, 2)
+        requests_count = len(self.app[REQUESTS_KEY])
+
+        with RateSnapshot(self.path) as snapshot:
+            self.assertEqual(snapshot.dates, ["2024-11-19", "2024-11-20"])
+            self.assertEqual(snapshot.table("usd")["eur"], 0.92)
+            offline_client = AsyncCurrencyConverter(snapshot=snapshot, currency_date="2024-11-19")
+            self.assertEqual(await offline_client.convert(100, "usd", "eur"), 92.0)
+            self.assertAlmostEqual(await offline_client.get_exchange_rate("eur", "gbp"), 0.81 / 0.92)
+            rates = await offline_client.get_exchange_rates(
+                [("usd", "uah", "2024-11-20"), ("usd", "uah", "2024-01-01")], errors="nan"
+            )
+            self.assertEqual(rates[0], 41.2)
+            self.assertTrue(math.isnan(rates[1]))
+            with self.assertRaises(KeyError):
+                await offline_client.get_exchange_rate("usd", "foo")
+        self.assertEqual(len(self.app[REQUESTS_KEY]), requests_count)
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as snapshot_file:
+            snapshot_file.write(b"not a snapshot file")
+        with self.assertRaises(ValueError):
+            RateSnapshot(self.path)
+
+
+class TestLatestRefresh(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.errors = []
+        self.currency_client = AsyncCurrencyConverter(
+            refresh_interval=0.05, max_staleness=10, on_refresh_error=lambda endpoint, err: self.errors.append(err)
+        )
+        print(f"Test: {self.id()}")
+
+    async def asyncTearDown(self):
+        await self.currency_client.aclose()
+
+    async def wait_for(self, condition, timeout: float = 2.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "condition wasn't met in time")
+            await asyncio.sleep(0.01)
+
+    @patch.object(ExchangeApiClient, "_fetch", new_callable=AsyncMock)
+    async def test_tables_are_refreshed_in_background(self, mock_fetch):
+        """Test that used latest tables are refreshed while readers are served from memory."""
+        mock_fetch.side_effect = itertools.chain(
+            [{"usd": {"eur": 0.92}, "date": "2024-11-29"}],
+            itertools.repeat({"usd": {"eur": 0.93}, "date": "2024-11-30"}),
+        )
+        self.assertEqual(await self.currency_client.get_exchange_rate("usd", "eur"), 0.92)
+        await self.wait_for(lambda: mock_fetch.await_count > 1)
+        await_count = mock_fetch.await_count
+        self.assertEqual(await self.currency_client.get_exchange_rate("usd", "eur"), 0.93)
+        # the read is served by the refreshed table, nothing is fetched on its behalf
+        self.assertEqual(mock_fetch.await_count, await_count)
+
+    @patch.object(ExchangeApiClient, "_fetch", new_callable=AsyncMock)
+    async def test_failed_refresh_keeps_last_known_table(self, mock_fetch):
+        """Test that failed refresh calls the callback and last known table is still served."""
+        mock_fetch.side_effect = itertools.chain(
+            [{"usd": {"eur": 0.92}, "date": "2024-11-29"}], itertools.repeat(RuntimeError("CDN is down"))
+        )
+        await self.currency_client.get_exchange_rate("usd", "eur")
+        await self.wait_for(lambda: self.errors)
+        self.assertIsInstance(self.errors[0], RuntimeError)
+        await_count = mock_fetch.await_count
+        self.assertEqual(await self.currency_client.get_exchange_rate("usd", "eur"), 0.92)
+        self.assertEqual(mock_fetch.await_count, await_count)
+
+    def test_invalid_staleness(self):
+        with self.assertRaises(ValueError):
+            ExchangeApiClient(refresh_interval=60, max_staleness=30)
+
+    @patch.object(ExchangeApiClient, "_fetch", new_callable=AsyncMock)
+    def test_sync_error_callback_calls_client(self, mock_fetch):
+        """Test that refresh error callback of sync API can call the client back."""
+        mock_fetch.side_effect = [{"usd": {"eur": 0.92}, "date": "2024-11-29"}] + [RuntimeError("CDN is down")] * 100
+        rates = []
+        currency_client = CurrencyConverter(
+            refresh_interval=0.02,
+            max_staleness=10,
+            on_refresh_error=lambda endpoint, err: rates.append(currency_client.get_exchange_rate("usd", "eur")),
+        )
+        try:
+            currency_client.get_exchange_rate("usd", "eur")
+            deadline = time.monotonic() + 2
+            while not rates and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(rates[0], 0.92)
+        finally:
+            currency_client.close()
+
+    @patch.object(ExchangeApiClient, "_fetch", new_callable=AsyncMock)
+    def test_dropped_sync_client_stops_refresh(self, mock_fetch):
+        """Test that sync client with refresh is garbage collected without close and its loop thread stops."""
+        mock_fetch.return_value = {"usd": {"eur": 0.92}, "date": "2024-11-29"}
+        currency_client = CurrencyConverter(refresh_interval=0.02, max_staleness=10)
+        currency_client.get_exchange_rate("usd", "eur")
+        loop_thread = currency_client._background_loop._thread
+        client_ref = weakref.ref(currency_client)
+        del currency_client
+        gc.collect()
+        self.assertIsNone(client_ref())
+        loop_thread.join(timeout=5)
+        self.assertFalse(loop_thread.is_alive())
+
+
+class TestResilientTransport(ExchangeApiTestCase):
+    def client_options(self):
+        return {
+            "fallback_apis": [str(self.server.make_url("/mirror")) + "/{date}"],
+            "backoff_base": 0.01,
+            "cache_maxsize": 0,
+        }
+
+    async def test_fallback_mirror(self):
+        """Test that failed request is retried against fallback mirror."""
+        self.app[BEHAVIOUR_KEY]["api"] = {"status": 503}
+        self.assertEqual(await self.currency_client.get_exchange_rate("usd", "eur"), 0.92)
+        self.assertEqual(
+            self.app[REQUESTS_KEY], ["/api@latest/v1/currencies/usd.json", "/mirror/latest/v1/currencies/usd.json"]
+        )
+
+    async def test_all_attempts_failed(self):
+        """Test that ExchangeApiError is raised instead of SystemExit when all retries failed."""
+        self.app[BEHAVIOUR_KEY].update(api={"status": 500}, mirror={"status": 502})
+        with self.assertRaises(ExchangeApiError) as cm:
+            await self.currency_client.get_exchange_rate("usd", "eur")
+        self.assertEqual(cm.exception.status, 500)
+        self.assertEqual(len(self.app[REQUESTS_KEY]), 3)
+
+    async def test_not_supported_currency_is_not_retried(self):
+        with self.assertRaises(CurrencyNotSupportedError):
+            await self.currency_client.get_exchange_rate("foo", "eur")
+        self.assertEqual(len(self.app[REQUESTS_KEY]), 1)
+
+    def test_default_fallback_only_for_default_api(self):
+        """Test that public mirror is the default fallback of the default API only."""
+        self.assertEqual(ExchangeApiClient().fallback_apis, ["https://{date}.currency-api.pages.dev"])
+        self.assertEqual(ExchangeApiClient(exchange_api=self.exchange_api).fallback_apis, [])
+
+    async def test_timeout(self):
+        """Test that request exceeding request_timeout is retried."""
+        self.app[BEHAVIOUR_KEY]["api"] = {"delay": 1}
+        self.currency_client.request_timeout = 0.1
+        self.assertEqual(await self.currency_client.get_exchange_rate("usd", "eur"), 0.92)
+
+    async def test_hedged_request(self):
+        """Test that slow primary mirror is hedged with request to fallback mirror."""
+        self.app[BEHAVIOUR_KEY]["api"] = {"delay": 1}
+        self.currency_client.hedge = True
+        self.currency_client.request_timeout = 0.2
+        started = asyncio.get_running_loop().time()
+        self.assertEqual(await self.currency_client.get_exchange_rate("usd", "eur"), 0.92)
+        self.assertLess(asyncio.get_running_loop().time() - started, 0.2)
+        self.assertIn("/mirror/latest/v1/currencies/usd.json", self.app[REQUESTS_KEY])
+
+
+class TestRequestCoalescing(ExchangeApiTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.app[BEHAVIOUR_KEY]["api"] = {"delay": 0.05}
+
+    async def test_concurrent_async_callers(self):
+        """Test that concurrent coroutines share one request and its exception."""
+        async with AsyncCurrencyConverter(exchange_api=self.exchange_api) as currency_client:
+            rates = await asyncio.gather(*(currency_client.get_exchange_rate("usd", "eur") for _ in range(10)))
+            self.assertEqual(rates, [0.92] * 10)
+            results = await asyncio.gather(
+                *(currency_client.get_exchange_rate("foo", "eur") for _ in range(5)), return_exceptions=True
+            )
+            self.assertTrue(all(isinstance(result, CurrencyNotSupportedError) for result in results))
+            self.assertEqual(currency_client._inflight.coalesced, 13)
+        self.assertEqual(len(self.app[REQUESTS_KEY]), 2)
+
+    async def test_concurrent_sync_callers(self):
+        """Test that sync callers from many threads share one request."""
+        currency_client = CurrencyConverter(exchange_api=self.exchange_api)
+        try:
+            rates = await asyncio.gather(
+                *(asyncio.to_thread(currency_client.get_exchange_rate, "eur", "usd") for _ in range(8))
+            )
+        finally:
+            await asyncio.to_thread(currency_client.close)
+        self.assertEqual(rates, [1.087] * 8)
+        self.assertEqual(len(self.app[REQUESTS_KEY]), 1)
+
+
+class TestSharedConverter(ExchangeApiTestCase):
+    async def test_per_call_date_from_many_threads(self):
+        """Test that one converter shared by threads serves different dates without changing currency_date."""
+        dates = ["2024-11-20", "2024-11-21", None, date(2024, 11, 22)]
+        currency_client = CurrencyConverter(exchange_api=self.exchange_api)
+        try:
+            amounts = await asyncio.gather(
+                *(asyncio.to_thread(currency_client.convert, 10, "usd", "eur", date=value) for value in dates * 4)
+            )
+            currencies = await asyncio.to_thread(currency_client.currencies, "uah", date="2024-11-20")
+        finally:
+            await asyncio.to_thread(currency_client.close)
+        self.assertEqual(amounts, [9.2] * 16)
+        self.assertEqual(currencies, "Hryvnia")
+        self.assertEqual(currency_client.currency_date, "latest")
+        self.assertEqual(
+            sorted(self.app[REQUESTS_KEY]),
+            [
+                "/api@2024-11-20/v1/currencies.json",
+                "/api@2024-11-20/v1/currencies/usd.json",
+                "/api@2024-11-21/v1/currencies/usd.json",
+                "/api@2024-11-22/v1/currencies/usd.json",
+                "/api@latest/v1/currencies/usd.json",
+            ],
+        )
+
+    async def test_async_per_call_date(self):
+        """Test date argument of async converter."""
+        async with AsyncCurrencyConverter(exchange_api=self.exchange_api) as currency_client:
+            self.assertEqual(await currency_client.get_exchange_rate("eur", "usd", date="2024-11-20"), 1.087)
+            self.assertEqual(await currency_client.convert(10, "usd", "uah", date="2024-11-20"), 412.0)
+        self.assertEqual(
+            self.app[REQUESTS_KEY], ["/api@2024-11-20/v1/currencies/eur.json", "/api@2024-11-20/v1/currencies/usd.json"]
+        )
+
+
+class TestConvertStream(ExchangeApiTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        self.tmp_dir.cleanup()
+
+    async def test_convert_stream_chunks(self):
+        """Test that rows are converted in chunks and every rate table is fetched once, even a failed one."""
+        rows = [{"amount": str(i + 1), "currency": "usd" if i % 2 else "EUR", "date": ""} for i in range(10)]
+        rows.insert(5, {"amount": "2", "currency": "foo", "date": "2024-11-20"})
+        rows.append({"amount": "1", "currency": "foo", "date": "2024-11-20"})
+        progress = []
+        currency_client = CurrencyConverter(exchange_api=self.exchange_api)
+        try:
+            result = await asyncio.to_thread(
+                lambda: list(
+                    convert_stream(
+                        currency_client,
+                        rows,
+                        "uah",
+                        chunk_size=4,
+                        errors="skip",
+                        progress=lambda *args: progress.append(args),
+                    )
+                )
+            )
+        finally:
+            await asyncio.to_thread(currency_client.close)
+        self.assertEqual(len(result), 10)
+        self.assertEqual(result[0]["amount_uah"], 44.78)
+        self.assertEqual(result[1]["amount_uah"], 82.4)
+        self.assertEqual([rows for rows, _ in progress], [4, 8, 12])
+        self.assertEqual(len(self.app[REQUESTS_KEY]), 3)
+
+    async def test_transient_prefetch_error_is_retried(self):
+        """Test that a table which failed to prefetch with HTTP 503 is requested again by the next chunks."""
+        self.app[BEHAVIOUR_KEY]["api"] = {"status": 503}
+        rows = [{"amount": "1", "currency": currency, "date": ""} for currency in ["usd", "usd", "eur", "eur", "eur"]]
+        currency_client = CurrencyConverter(exchange_api=self.exchange_api, fallback_apis=[], max_retries=0)
+        try:
+            result = await asyncio.to_thread(
+                lambda: list(
+                    convert_stream(
+                        currency_client,
+                        rows,
+                        "uah",
+                        chunk_size=2,
+                        # the server recovers after the first chunk
+                        progress=lambda *args: self.app[BEHAVIOUR_KEY].clear(),
+                    )
+                )
+            )
+        finally:
+            await asyncio.to_thread(currency_client.close)
+        self.assertTrue(all(math.isnan(row["amount_uah"]) for row in result[:2]))
+        self.assertEqual([row["amount_uah"] for row in result[2:]], [44.78] * 3)
+
+    async def test_cli_convert(self):
+        """Test convert command of CLI with CSV input and JSON Lines output."""
+        input_path = os.path.join(self.tmp_dir.name, "transactions.csv")
+        output_path = os.path.join(self.tmp_dir.name, "converted.jsonl")
+        with open(input_path, "w") as input_file:
+            input_file.write("id,amount,currency\n1,100,usd\n2,10,eur\n3,oops,usd\n")
+        argv = ["--exchange-api", self.exchange_api, "convert", input_path, "-o", output_path, "--to", "UAH", "-q"]
+        await asyncio.to_thread(cli.main, argv)
+        with open(output_path) as output_file:
+            result = [json.loads(line, parse_constant=self.fail) for line in output_file]
+        self.assertEqual([row["amount_uah"] for row in result[:2]], [4120.0, 447.8])
+        self.assertIsNone(result[2]["amount_uah"])
+
+
+class TestMetrics(ExchangeApiTestCase):
+    async def test_request_stages_and_counters(self):
+        """Test that stage timings, requests by status, bytes and cache hits are collected."""
+        events = []
+        metrics = Metrics(callback=lambda name, value, labels: events.append(name))
+        currency_client = CurrencyConverter(exchange_api=self.exchange_api, fallback_apis=[], metrics=metrics)
+        try:
+            await asyncio.to_thread(currency_client.convert, 10, "usd", "eur")
+            await asyncio.to_thread(currency_client.convert, 10, "usd", "uah")
+            with self.assertRaises(CurrencyNotSupportedError):
+                await asyncio.to_thread(currency_client.get_exchange_rate, "foo", "eur")
+        finally:
+            await asyncio.to_thread(currency_client.close)
+        snapshot = metrics.snapshot()
+        self.assertEqual(set(snapshot["stages"]), {"url", "connect", "transfer", "decode", "lookup"})
+        self.assertEqual(snapshot["stages"]["lookup"]["count"], 2)
+        self.assertEqual(snapshot["stages"]["lookup"]["buckets"]["+Inf"], 2)
+        self.assertEqual(snapshot["requests"], {"/currencies/usd.json": {"200": 1}, "/currencies/foo.json": {"404": 1}})
+        self.assertGreater(snapshot["bytes_downloaded"], 0)
+        self.assertEqual((snapshot["cache_hits"], snapshot["cache_misses"]), (1, 2))
+        self.assertEqual(events.count("requests"), 2)
+
+    def test_prometheus_text(self):
+        """Test Prometheus text exposition of collected values."""
+        metrics = Metrics(buckets=(0.01, 0.1))
+        metrics.observe("decode", 0.005)
+        metrics.observe("decode", 0.05)
+        metrics.request("/currencies/usd.json", 200, size=512)
+        metrics.cache(hit=False)
+        text = metrics.to_prometheus()
+        self.assertIn('pyxrate_stage_seconds_bucket{stage="decode",le="0.01"} 1', text)
+        self.assertIn('pyxrate_stage_seconds_bucket{stage="decode",le="+Inf"} 2', text)
+        self.assertIn('pyxrate_stage_seconds_count{stage="decode"} 2', text)
+        self.assertIn('pyxrate_requests_total{endpoint="/currencies/usd.json",status="200"} 1', text)
+        self.assertIn("pyxrate_bytes_downloaded_total 512", text)
+        self.assertIn("pyxrate_cache_misses_total 1", text)
+
+
+class TestCurrencyIndex(ExchangeApiTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.index = CurrencyIndex(
+            {"usd": "US Dollar", "usdt": "Tether", "aud": "Australian Dollar", "uah": "Hryvnia", "eur": "Euro"}
+        )
+
+    def test_search(self):
+        """Test prefix search by code first and then by words of the name."""
+        self.assertIn("usd", self.index)
+        self.assertNotIn("foo", self.index)
+        self.assertEqual(self.index.search("US"), [("usd", "US Dollar"), ("usdt", "Tether")])
+        self.assertEqual(self.index.search("dol"), [("aud", "Australian Dollar"), ("usd", "US Dollar")])
+        self.assertEqual(self.index.search("u", limit=2), [("uah", "Hryvnia"), ("usd", "US Dollar")])
+        self.assertEqual(self.index.search(" "), [])
+        with self.assertRaises(KeyError):
+            self.index.name("foo")
+
+    async def test_invalid_codes_rejected_without_requests(self):
+        """Test that invalid codes are rejected by the index fetched once, also in batch conversion."""
+        async with AsyncCurrencyConverter(exchange_api=self.exchange_api, validate_currencies=True) as currency_client:
+            for _ in range(3):
+                with self.assertRaises(CurrencyNotSupportedError):
+                    await currency_client.get_exchange_rate("foo", "eur")
+            result = await currency_client.convert_many([(10, "usd", "eur"), (10, "bar", "eur")], errors="nan")
+            self.assertEqual(result[0], 9.2)
+            self.assertTrue(math.isnan(result[1]))
+            self.assertEqual(await currency_client.search_currencies("hr"), [("uah", "Hryvnia")])
+        self.assertEqual(
+            self.app[REQUESTS_KEY], ["/api@latest/v1/currencies.json", "/api@latest/v1/currencies/usd.json"]
+        )
+
+    async def test_bundled_index(self):
+        """Test that saved index validates codes on cold start without network."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "currencies.json")
+            self.index.save(path)
+            currency_index = CurrencyIndex.load(path)
+        self.assertEqual(currency_index.names, self.index.names)
+        currency_client = CurrencyConverter(
+            exchange_api=self.exchange_api, validate_currencies=True, currency_index=currency_index
+        )
+        try:
+            with self.assertRaises(CurrencyNotSupportedError):
+                await asyncio.to_thread(currency_client.convert, 10, "usd", "foo")
+        finally:
+            await asyncio.to_thread(currency_client.close)
+        self.assertEqual(self.app[REQUESTS_KEY], [])
+
+
+class TestConditionalRequests(ExchangeApiTestCase):
+    async def test_not_modified_table_is_reused(self):
+        """Test that expired latest table is revalidated with If-None-Match and 304 reuses stored table."""
+        metrics = Metrics()
+        async with AsyncCurrencyConverter(exchange_api=self.exchange_api, latest_ttl=0, metrics=metrics) as client:
+            for _ in range(3):
+                self.assertEqual(await client.get_exchange_rate("usd", "eur"), 0.92)
+            RATES["usd"]["eur"] = 0.95
+            try:
+                self.assertEqual(await client.get_exchange_rate("usd", "eur"), 0.95)
+            finally:
+                RATES["usd"]["eur"] = 0.92
+        self.assertEqual(metrics.snapshot()["requests"], {"/currencies/usd.json": {"200": 2, "304": 2}})
+
+    async def test_validators_disabled(self):
+        """Test that validators_maxsize=0 disables conditional requests."""
+        metrics = Metrics()
+        async with AsyncCurrencyConverter(
+            exchange_api=self.exchange_api, latest_ttl=0, validators_maxsize=0, metrics=metrics
+        ) as client:
+            for _ in range(2):
+                await client.get_exchange_rate("usd", "eur")
+        self.assertEqual(metrics.snapshot()["requests"], {"/currencies/usd.json": {"200": 2}})
+
+
+class TestSharedRateStore(ExchangeApiTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.name = f"pyxrate-test-{os.getpid()}"
+        self.store = SharedRateStore.create(self.name, codes_capacity=8, tables_capacity=4, metadata_capacity=1024)
+
+    async def asyncTearDown(self):
+        self.store.unlink()
+        await super().asyncTearDown()
+
+    async def test_publish_and_read(self):
+        """Test that published tables are read by another store instance, including cross rates."""
+        worker_store = SharedRateStore(self.name)
+        self.assertEqual(worker_store.version, 0)
+        self.assertIsNone(worker_store.rate("usd", "eur"))
+        self.store.publish({("latest", "usd"): {"date": "2024-11-29", "usd": RATES["usd"]}})
+        self.assertEqual(worker_store.version, 1)
+        self.assertEqual(worker_store.rate("usd", "eur"), 0.92)
+        self.assertAlmostEqual(worker_store.rate("eur", "uah"), 41.2 / 0.92)
+        self.assertIsNone(worker_store.rate("usd", "eur", "2024-11-20"))
+        self.assertIsNone(worker_store.rate("usd", "foo"))
+        self.assertEqual(worker_store.tables(), [("latest", "usd")])
+        worker_store.close()
+
+        script = (
+            "from currency_exchange.shared_store import SharedRateStore\n"
+            f"print(SharedRateStore({self.name!r}).rate('usd', 'uah'))"
+        )
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "41.2")
+
+    async def test_leader_crashed_during_publish(self):
+        """Test that a new leader recovers the segment left with odd sequence by a crashed publish."""
+        self.store.publish({("latest", "usd"): {"date": "2024-11-29", "usd": RATES["usd"]}})
+        buf = self.store._shm.buf
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0] + 1)
+        worker_store = SharedRateStore(self.name)
+        self.assertIsNone(worker_store.rate("usd", "eur"))
+
+        leader_store = SharedRateStore.create(self.name, codes_capacity=8, tables_capacity=4, metadata_capacity=1024)
+        self.assertIsNone(worker_store.rate("usd", "eur"))
+        self.assertEqual(worker_store.tables(), [])
+        leader_store.publish({("latest", "usd"): {"date": "2024-11-29", "usd": RATES["usd"]}})
+        self.assertEqual(worker_store.rate("usd", "eur"), 0.92)
+        self.assertEqual(SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0] % 2, 0)
+
+        # publish after a crash without recovery by create() still ends with even sequence
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0] + 1)
+        leader_store.publish({("latest", "usd"): {"date": "2024-11-29", "usd": RATES["usd"]}})
+        self.assertEqual(worker_store.rate("usd", "gbp"), 0.81)
+        worker_store.close()
+        leader_store.close()
+
+    async def test_stale_content_is_ignored(self):
+        """Test that content not republished within max_age is ignored, e.g. after the leader died."""
+        self.store.publish({("latest", "usd"): {"date": "2024-11-29", "usd": RATES["usd"]}})
+        worker_store = SharedRateStore(self.name, max_age=60)
+        unbounded_store = SharedRateStore(self.name, max_age=None)
+        try:
+            self.assertEqual(worker_store.rate("usd", "eur"), 0.92)
+            with patch("time.time", return_value=time.time() + 61):
+                self.assertIsNone(worker_store.rate("usd", "eur"))
+                self.assertEqual(unbounded_store.rate("usd", "eur"), 0.92)
+            self.store.publish({("latest", "usd"): {"date": "2024-11-29", "usd": RATES["usd"]}})
+            self.assertEqual(worker_store.rate("usd", "eur"), 0.92)
+        finally:
+            worker_store.close()
+            unbounded_store.close()
+
+    async def test_capacity(self):
+        table = {"date": "2024-11-29", "usd": {f"c{i}": 1.0 for i in range(10)}}
+        with self.assertRaises(ValueError):
+            self.store.publish({("latest", "usd"): table})
+        with self.assertRaises(ValueError):
+            SharedRateStore.create(self.name, codes_capacity=16)
+
+    async def test_absent_store(self):
+        """Test that converter with absent store fetches rates as usual."""
+        store = SharedRateStore(f"{self.name}-absent")
+        self.assertIsNone(store.rate("usd", "eur"))
+        async with AsyncCurrencyConverter(exchange_api=self.exchange_api, shared_store=store) as client:
+            self.assertEqual(await client.get_exchange_rate("usd", "eur"), 0.92)
+        self.assertEqual(len(self.app[REQUESTS_KEY]), 1)
+
+    async def test_converter_reads_published_rates(self):
+        """Test that leader publishes tables and worker converters read them without requests."""
+        leader = CurrencyConverter(exchange_api=self.exchange_api)
+        publisher = SharedRatePublisher(leader, self.store, currencies=["USD", "foo"], dates=["latest", "2024-11-20"])
+        try:
+            self.assertEqual(await asyncio.to_thread(publisher.publish), 2)
+        finally:
+            await asyncio.to_thread(leader.close)
+        self.assertEqual(self.store.tables(), [("latest", "usd"), ("2024-11-20", "usd")])
+        requests_count = len(self.app[REQUESTS_KEY])
+
+        async with AsyncCurrencyConverter(
+            exchange_api=self.exchange_api, shared_store=SharedRateStore(self.name)
+        ) as worker:
+            self.assertEqual(await worker.convert(100, "USD", "EUR"), 92.0)
+            self.assertEqual(await worker.get_exchange_rate("usd", "uah", date="2024-11-20"), 41.2)
+            rates = await worker.get_exchange_rates([("usd", "gbp"), ("eur", "gbp", "2024-11-20")])
+            self.assertEqual(rates[0], 0.81)
+            self.assertAlmostEqual(rates[1], 0.81 / 0.92)
+            self.assertEqual(len(self.app[REQUESTS_KEY]), requests_count)
+            # table of the date which is not published is fetched
+            self.assertEqual(await worker.get_exchange_rate("usd", "eur", date="2024-11-19"), 0.92)
+            self.assertEqual(len(self.app[REQUESTS_KEY]), requests_count + 1)
+
+
+class TestWatch(ExchangeApiTestCase):
+    async def asyncTearDown(self):
+        RATES["usd"].update(eur=0.92, gbp=0.81)
+        await super().asyncTearDown()
+
+    async def wait_baseline(self, subscription):
+        while len(subscription._rates) < len(subscription.pairs):
+            await asyncio.sleep(0.01)
+
+    async def test_async_iterator(self):
+        """Test that subscriptions of one base share a poller and receive only changed pairs."""
+        async with AsyncCurrencyConverter(exchange_api=self.exchange_api) as client:
+            subscription = await client.watch([("USD", "EUR"), ("usd", "gbp")], interval=0.02)
+            other = await client.watch([("usd", "uah")], interval=0.02)
+            self.assertEqual(len(client._watcher._pollers), 1)
+            await self.wait_baseline(subscription)
+            RATES["usd"]["eur"] = 0.95
+            changes = await asyncio.wait_for(anext(subscription), 1)
+            self.assertEqual(changes, [RateChange("usd", "eur", 0.92, 0.95, "2024-11-29")])
+            self.assertAlmostEqual(changes[0].relative_delta, 0.03 / 0.92)
+            self.assertTrue(other._queue.empty())
+            subscription.close()
+            other.close()
+            self.assertEqual(await anext(subscription, None), None)
+            self.assertEqual(client._watcher._pollers, {})
+
+    async def test_callback_threshold(self):
+        """Test that sync callbacks get only moves above threshold and polling stops on close."""
+        received = []
+        client = CurrencyConverter(exchange_api=self.exchange_api)
+        try:
+            subscription = await asyncio.to_thread(
+                client.watch, [("usd", "eur"), ("usd", "gbp")], received.extend, interval=0.02, threshold=0.05
+            )
+            await self.wait_baseline(subscription)
+            RATES["usd"]["eur"] = 0.93
+            RATES["usd"]["gbp"] = 0.9
+            while not received:
+                await asyncio.sleep(0.01)
+            self.assertEqual(received, [RateChange("usd", "gbp", 0.81, 0.9, "2024-11-29")])
+            await asyncio.to_thread(subscription.close)
+            await asyncio.sleep(0.05)
+            requests_count = len(self.app[REQUESTS_KEY])
+            await asyncio.sleep(0.05)
+            self.assertEqual(len(self.app[REQUESTS_KEY]), requests_count)
+        finally:
+            await asyncio.to_thread(client.close)
+
+    async def test_invalid_arguments(self):
+        async with AsyncCurrencyConverter(exchange_api=self.exchange_api) as client:
+            with self.assertRaises(ValueError):
+                await client.watch([("usd", "eur")], interval=0)
+
+    async def test_callback_calls_converter(self):
+        """Test that sync callbacks run outside of the background loop and can call the converter back."""
+        converted = []
+        client = CurrencyConverter(exchange_api=self.exchange_api)
+
+        def on_change(changes):
+            converted.append(client.convert(100, changes[0].currency_to_exchange, "gbp"))
+
+        try:
+            subscription = await asyncio.to_thread(client.watch, [("usd", "eur")], on_change, interval=0.02)
+            await self.wait_baseline(subscription)
+            RATES["usd"]["eur"] = 0.95
+            while not converted:
+                await asyncio.sleep(0.01)
+            self.assertEqual(converted[0], 81.0)
+            await asyncio.to_thread(subscription.close)
+        finally:
+            await asyncio.to_thread(client.close)
+
+    async def test_sync_call_from_loop_thread(self):
+        """Test that sync API called from its own background loop thread fails instead of waiting forever."""
+        client = CurrencyConverter(exchange_api=self.exchange_api)
+        try:
+
+            async def call_back():
+                return client.get_exchange_rate("usd", "eur")
+
+            with self.assertRaises(RuntimeError):
+                await asyncio.to_thread(client._run, call_back())
+            self.assertEqual(await asyncio.to_thread(client.get_exchange_rate, "usd", "eur"), 0.92)
+        finally:
+            await asyncio.to_thread(client.close)
+
+
+@unittest.skipUnless(arrays.import_numpy(), "numpy is not installed")
+class TestConvertArray(ExchangeApiTestCase):
+    def client_options(self):
+        return {}
+
+    async def test_convert_array(self):
+        """Test that every distinct pair is resolved once and result is written into out buffer."""
+        np = arrays.import_numpy()
+        amounts = np.array([100, 10, 200, 1, 50])
+        currencies_to_get = np.array(["eur", "uah", "gbp", "UAH", "eur"])
+        dates = np.array(["2024-11-29", "2024-11-29", "2024-11-29", "2024-11-20", "2024-11-29"], dtype="datetime64")
+        out = np.empty(5)
+        result = await self.currency_client.convert_array(amounts, "usd", currencies_to_get, dates, out=out)
+        self.assertIs(result, out)
+        np.testing.assert_array_equal(result, [92.0, 412.0, 162.0, 41.2, 46.0])
+        self.assertEqual(len(self.app[REQUESTS_KEY]), 2)
+
+        result = await self.currency_client.convert_array([100, 10], np.array(["usd", "eur"]), "uah")
+        np.testing.assert_array_equal(result, [4120.0, 447.8])
+
+    async def test_errors(self):
+        np = arrays.import_numpy()
+        with self.assertRaises(CurrencyTypeError):
+            await self.currency_client.convert_array(np.array(["100"]), "usd", "eur")
+        with self.assertRaises(CurrencyAmountValueError):
+            await self.currency_client.convert_array(np.array([100, -1]), "usd", "eur")
+        with self.assertRaises(KeyError):
+            await self.currency_client.convert_array(np.array([100, 1]), "usd", ["eur", "foo"])
+        with self.assertRaises(ValueError):
+            await self.currency_client.convert_array(np.array([100, 1]), "usd", ["eur"])
+        with self.assertRaises(ValueError):
+            await self.currency_client.convert_array(np.array([100]), "usd", "eur", errors="skip")
+        result = await self.currency_client.convert_array(
+            np.array([100, -1, np.nan, 5]), ["usd", "usd", "usd", "bar"], "eur", errors="nan"
+        )
+        self.assertEqual(result[0], 92.0)
+        self.assertTrue(np.isnan(result[1:]).all())
+
+    async def test_rounding_matches_convert(self):
+        """Test that array results are rounded like convert, including half cent products."""
+        amounts = [0.5, 3.5, 5.0, 35.0, 0.75, 2.25, 767.03, 12.34]
+        currencies_to_exchange = ["usd", "usd", "eur", "eur", "eur", "eur", "usd", "usd"]
+        currencies_to_get = ["gbp", "gbp", "usd", "usd", "uah", "uah", "eur", "uah"]
+        expected = [
+            await self.currency_client.convert(*row) for row in zip(amounts, currencies_to_exchange, currencies_to_get)
+        ]
+        result = await self.currency_client.convert_array(amounts, currencies_to_exchange, currencies_to_get)
+        self.assertEqual(list(result), expected)
+        with patch("currency_exchange.arrays.import_numpy", lambda: None):
+            result = await self.currency_client.convert_array(amounts, currencies_to_exchange, currencies_to_get)
+        self.assertEqual(list(result), expected)
+
+    async def test_without_numpy(self):
+        """Test that sequences are converted with array module when numpy isn't installed."""
+        with patch("currency_exchange.arrays.import_numpy", lambda: None):
+            result = await self.currency_client.convert_array([100, 10, 1], "usd", ["eur", "uah", "eur"])
+        self.assertEqual(list(result), [92.0, 412.0, 0.92])
+
+
+class TestStdlibTransport(ExchangeApiTestCase):
+    async def test_sync_converter(self):
+        """Test that stdlib transport reuses keep-alive connection, decodes gzip and revalidates tables."""
+        metrics = Metrics()
+        client = CurrencyConverter(exchange_api=self.exchange_api, http_backend="stdlib", latest_ttl=0, metrics=metrics)
+        try:
+            for _ in range(3):
+                self.assertEqual(await asyncio.to_thread(client.convert, 100, "usd", "eur"), 92.0)
+            self.assertEqual(
+                await asyncio.to_thread(client.get_exchange_rates, [("eur", "uah"), ("usd", "uah", "2024-11-20")]),
+                [44.78, 41.2],
+            )
+            with self.assertRaises(CurrencyNotSupportedError):
+                await asyncio.to_thread(client.get_exchange_rate, "foo", "usd")
+            # both connections of get_exchange_rates are kept unless the second request found the first one idle
+            self.assertEqual(len(client.transport._idle), 1)
+            self.assertIn(len(next(iter(client.transport._idle.values()))), (1, 2))
+        finally:
+            await asyncio.to_thread(client.close)
+        self.assertEqual(metrics.snapshot()["requests"]["/currencies/usd.json"], {"200": 2, "304": 2})
+
+    async def test_async_converter(self):
+        self.app[BEHAVIOUR_KEY]["api"] = {"status": 500}
+        async with AsyncCurrencyConverter(
+            exchange_api=self.exchange_api,
+            fallback_apis=[str(self.server.make_url("/mirror/{date}"))],
+            http_backend="stdlib",
+            backoff_base=0,
+        ) as client:
+            self.assertEqual(await client.get_exchange_rate("usd", "gbp"), 0.81)
+
+    async def test_redirects(self):
+        """Test that redirects are followed up to max_redirects and other 3xx responses are errors."""
+        transport = StdlibTransport()
+        url = str(self.server.make_url("/api@latest/v1/currencies/usd.json"))
+        try:
+            self.app[BEHAVIOUR_KEY]["api"] = {"redirect": "mirror"}
+            self.assertEqual((await transport.get_json(url))["usd"], RATES["usd"])
+            self.assertEqual(self.app[REQUESTS_KEY][-1], "/mirror@latest/v1/currencies/usd.json")
+
+            self.app[BEHAVIOUR_KEY]["api"] = {"redirect": "api"}
+            with self.assertRaisesRegex(ExchangeApiError, "more than 10 redirects"):
+                await transport.get_json(url)
+
+            self.app[BEHAVIOUR_KEY]["api"] = {"status": 302}
+            with self.assertRaises(ExchangeApiError) as cm:
+                await transport.get_json(url)
+            self.assertEqual(cm.exception.status, 302)
+        finally:
+            await transport.aclose()
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            CurrencyConverter(http_backend="requests")
+
+    def test_optional_dependencies_are_imported_lazily(self):
+        script = (
+            "import sys, currency_exchange.converter, currency_exchange.cli; "
+            "print('aiohttp' in sys.modules, 'numpy' in sys.modules)"
+        )
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False False")
+
+
 if __name__ == '__main__':
     unittest.main()